@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+# Authors: Elizaveta Sineva, Sara Chilson
+"""
+Annotate word lists (e.g. stimulus lists) with the FILMS frequency data.
+
+Every word is annotated with its rank, frequency, frequency per million,
+Zipf value and IPA transcription from the tables in data/word_freq.
+The words are read and written in chunks and joined with the tables of
+their language all at once, so that lists of millions of words can be
+annotated without loading them into memory.
+"""
+
+import argparse
+import itertools
+import os
+
+import pandas as pd
+
+from main import ABBR2FULL
+
+
+# The columns added to the words
+FREQ_COLUMNS = ["Rank", "Frequency", "Frequency per million", "Zipf value"]
+
+# The number of words annotated at once
+CHUNK_SIZE = 100000
+
+# The table formats in the order of preference
+# (the xlsx tables are reduced to the top 100k words)
+TABLE_TYPES = ["txt", "txt.gz", "txt.zst", "xlsx"]
+
+# The ways of matching the words to the words in the tables
+# (the words in the tables are lower-cased)
+CASE_FOLDS = {"lower":    lambda words: words.str.lower(),
+              "casefold": lambda words: words.str.casefold(),
+              "none":     lambda words: words}
+
+
+
+def load_table(file_name):
+    """
+    Loads a frequency table in any of the supported formats.
+
+    Parameters
+    ----------
+    file_name : str
+        The name of the table file / path to the table file
+            without the extension.
+
+    Raises
+    ------
+    Exception
+        If the table does not exist in any of the supported formats.
+
+    Returns
+    -------
+    table : pandas DataFrame
+        The frequency table indexed by the word.
+
+    """
+    for table_type in TABLE_TYPES:
+        table_file = f"{file_name}.{table_type}"
+
+        if not os.path.exists(table_file):
+            continue
+
+        # Words like "nan" or "null" must not be read as missing values
+        if table_type == "xlsx":
+            table = pd.read_excel(table_file, keep_default_na=False)
+        else:
+            table = pd.read_csv(table_file, sep='\t', keep_default_na=False,
+                                encoding="utf-8")
+
+        table["Word"] = table["Word"].astype(str)
+        return table.set_index("Word")
+
+    raise Exception(f"The frequency table {file_name} does not exist.")
+
+
+
+def load_language(lang, data_dir="data/word_freq/", ipa=True):
+    """
+    Loads the frequency information (and IPA) of a given language.
+
+    Parameters
+    ----------
+    lang : str
+        The name of the language (see ABBR2FULL in main.py).
+    data_dir : str, optional
+        The path to the directory with the word frequency tables.
+        The default is "data/word_freq/".
+    ipa : bool, optional
+        Set to True to add the IPA transcriptions. The default is True.
+
+    Returns
+    -------
+    table : pandas DataFrame
+        The frequency information (and IPA) indexed by the word.
+
+    """
+    # Make sure the data folder name is in an appropriate format
+    if data_dir[-1] != "/":
+        data_dir = data_dir + "/"
+
+    table = load_table(f"{data_dir}{lang}.word.freq")[FREQ_COLUMNS]
+
+    if ipa:
+        ipa_table = load_table(f"{data_dir}{lang}.word.freq.ipa")
+        table = table.join(ipa_table["IPA"], how="left")
+
+    return table
+
+
+
+def annotate_chunk(chunk, tables, data_dir="data/word_freq/", ipa=True,
+                   case_fold="lower"):
+    """
+    Annotates a chunk of words with their frequency information.
+
+    Parameters
+    ----------
+    chunk : pandas DataFrame
+        The words to annotate with the columns Language and Word.
+    tables : dict
+        The already loaded tables of the languages (language to its table).
+        The tables of new languages are added to it.
+    data_dir : str, optional
+        The path to the directory with the word frequency tables.
+        The default is "data/word_freq/".
+    ipa : bool, optional
+        Set to True to add the IPA transcriptions. The default is True.
+    case_fold : str, optional
+        How to match the words to the lower-cased words in the tables:
+            "lower", "casefold" (also rewrites e.g. ß as ss) or "none".
+        The default is "lower".
+
+    Raises
+    ------
+    Exception
+        If the frequency information is not available for a language.
+
+    Returns
+    -------
+    annotated : pandas DataFrame
+        The words with the added columns Rank, Frequency,
+            Frequency per million, Zipf value and IPA (optional).
+
+    """
+    columns = FREQ_COLUMNS + ["IPA"] if ipa else FREQ_COLUMNS
+
+    chunk = chunk.astype(str)
+    # Both the full language names and their abbreviations are accepted
+    langs = chunk["Language"].str.lower().replace(ABBR2FULL)
+
+    annotated = []
+
+    # Join the words of every language with its table at once
+    for lang, lang_idx in langs.groupby(langs).groups.items():
+        if lang not in ABBR2FULL.values():
+            raise Exception(f"The frequency information is not available for language {lang}.")
+
+        if lang not in tables:
+            tables[lang] = load_language(lang, data_dir=data_dir, ipa=ipa)
+        table = tables[lang]
+
+        words = CASE_FOLDS[case_fold](chunk.loc[lang_idx, "Word"])
+        lang_info = table.reindex(words.to_numpy())
+        lang_info.index = lang_idx
+
+        if ipa:
+            # Rewrite ß as ss to search for IPA
+            # to account for German spelling versions
+            no_ipa = lang_info["IPA"].isna().to_numpy() & words.str.contains("ß").to_numpy()
+            if no_ipa.any():
+                ss_words = words[no_ipa].str.replace("ß", "ss")
+                lang_info.loc[no_ipa, "IPA"] = table["IPA"].reindex(ss_words.to_numpy()).to_numpy()
+
+        annotated.append(lang_info)
+
+    annotated = pd.concat(annotated).reindex(chunk.index)
+    annotated = pd.concat([chunk[["Language", "Word"]], annotated[columns]], axis=1)
+
+    # Keep the frequencies as integers despite the missing words
+    annotated = annotated.astype({"Rank": "Int64", "Frequency": "Int64"})
+
+    return annotated
+
+
+
+def iter_chunks(word_pairs, chunk_size=CHUNK_SIZE):
+    """
+    Splits the words into chunks.
+
+    Parameters
+    ----------
+    word_pairs : str or iterable of (str, str)
+        The path to a tab separated file with the columns Language and Word,
+            or the (language, word) pairs.
+    chunk_size : int, optional
+        The number of words in a chunk. The default is CHUNK_SIZE.
+
+    Yields
+    ------
+    chunk : pandas DataFrame
+        The words with the columns Language and Word.
+
+    """
+    if isinstance(word_pairs, str):
+        yield from pd.read_csv(word_pairs, sep='\t', usecols=["Language", "Word"],
+                               dtype=str, keep_default_na=False,
+                               chunksize=chunk_size, encoding="utf-8")
+        return
+
+    word_pairs = iter(word_pairs)
+    start = 0
+
+    while True:
+        chunk = list(itertools.islice(word_pairs, chunk_size))
+        if not chunk:
+            break
+
+        index = pd.RangeIndex(start, start + len(chunk))
+        yield pd.DataFrame(chunk, columns=["Language", "Word"], index=index)
+        start += len(chunk)
+
+
+
+def annotate(word_pairs, out_file, data_dir="data/word_freq/", ipa=True,
+             case_fold="lower", chunk_size=CHUNK_SIZE):
+    """
+    Annotates the words with their rank, frequency, frequency per million,
+    Zipf value and IPA from the FILMS tables, and writes them into a file
+    chunk by chunk. The words that are not in the tables are left empty.
+
+    Parameters
+    ----------
+    word_pairs : str or iterable of (str, str)
+        The path to a tab separated file with the columns Language and Word,
+            or the (language, word) pairs.
+        The languages can be given by their name or abbreviation
+            (see ABBR2FULL in main.py).
+    out_file : str
+        The path to the tab separated file to write the annotated words into.
+        The file is compressed if it ends with e.g. ".gz" or ".zst".
+    data_dir : str, optional
+        The path to the directory with the word frequency tables.
+        The default is "data/word_freq/".
+    ipa : bool, optional
+        Set to True to add the IPA transcriptions. The default is True.
+    case_fold : str, optional
+        How to match the words to the lower-cased words in the tables:
+            "lower", "casefold" (also rewrites e.g. ß as ss) or "none".
+        The default is "lower".
+    chunk_size : int, optional
+        The number of words annotated at once. The default is CHUNK_SIZE.
+
+    Raises
+    ------
+    Exception
+        If the requested case folding is not supported by the function.
+
+    Returns
+    -------
+    None.
+
+    """
+    if case_fold not in CASE_FOLDS:
+        raise Exception(f"Unsupported case folding {case_fold}.")
+
+    tables = {}
+
+    for chunk_idx, chunk in enumerate(iter_chunks(word_pairs, chunk_size)):
+        annotated = annotate_chunk(chunk, tables, data_dir=data_dir,
+                                   ipa=ipa, case_fold=case_fold)
+
+        # Write the header with the first chunk and append the rest
+        first_chunk = chunk_idx == 0
+        annotated.to_csv(out_file, sep='\t', index=False, header=first_chunk,
+                         mode="w" if first_chunk else "a", encoding="utf-8")
+
+
+
+if __name__ == "__main__":
+    argdesc = "The script for annotating word lists with the FILMS frequency data."
+    argparser = argparse.ArgumentParser(description=argdesc)
+
+    argparser.add_argument("-f", "--file", type=str, required=True,
+                            help="the path to the tab separated file with the columns Language and Word (required)")
+    argparser.add_argument("-o", "--output", type=str, required=True,
+                            help="the path to the tab separated file to write the annotated words into (required)")
+    argparser.add_argument("-d", "--data", type=str, default="data/word_freq/",
+                            help="the path to the directory with the word frequency tables; default: data/word_freq/")
+    argparser.add_argument("-i", "--ipa", default=True,
+                            action=argparse.BooleanOptionalAction,
+                            help="add the IPA transcriptions; default: True")
+    argparser.add_argument("-c", "--case-fold", type=str, default="lower",
+                            choices=list(CASE_FOLDS),
+                            help="how to match the words to the lower-cased words in the tables; default: lower")
+
+    args = argparser.parse_args()
+
+    annotate(args.file, args.output, data_dir=args.data, ipa=args.ipa,
+             case_fold=args.case_fold)
@@ -105,24 +105,15 @@ def collect_ipa(lang, data_dir):
         excep_msg = f"The IPA information is not supported for language {lang}."
         raise Exception(excep_msg)
     
-    ipa_dict = {}
-    
     # Go through every IPA file that exists for the given language
-    for lang_file in LANG2FILE[lang].split("|"):
-        # Extract the IPA data
-        data = pd.read_csv(data_dir+lang_file, sep='\t',
-                            names=["Word", "IPA"], header=None)
-
-        for index, row in data.iterrows():
-            word, ipa = row["Word"], row["IPA"]
-            
-            # Add the new word to the dictionary
-            if word not in ipa_dict:
-                ipa_dict[word] = ipa
-            
-            # Add the new IPA to the word if it is already in the dictionary
-            else:
-                ipa_dict[word] = ipa_dict[word] + "  |  " + ipa
+    # and extract the IPA data
+    data = pd.concat([pd.read_csv(data_dir+lang_file, sep='\t',
+                                  names=["Word", "IPA"], header=None)
+                      for lang_file in LANG2FILE[lang].split("|")])
+    
+    # Join all of the IPA transcriptions of the same word
+    # (in the order they appear in the files)
+    ipa_dict = data.groupby("Word", sort=False)["IPA"].agg("  |  ".join).to_dict()
     
     return ipa_dict
 
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+# Authors: Elizaveta Sineva, Sara Chilson
+"""
+Cache the processed (tokenised) corpus on disk.
+
+The data is processed with process_sent once, and every word is stored as
+its vocabulary ID in a binary file that is memory-mapped when the cache is
+read. The frequencies can then be counted again (e.g. with other options)
+directly from the IDs with NumPy, without decompressing and processing
+the raw data again.
+
+The cache consists of the following files:
+    [prefix].vocab.txt    - the words, one per line (the line number is the ID)
+    [prefix].ids.bin      - the word IDs of the whole corpus (int32)
+    [prefix].offsets.bin  - the index of the first word of every line (int64)
+    [prefix].lines.bin    - the 64-bit fingerprint of every raw line (uint64)
+    [prefix].deleted.json - the characters removed by process_sent
+    [prefix].meta.json    - the data file and the version of process_sent
+                            the cache was made from
+
+The files are written under temporary names and renamed once all of them
+are complete, and the cache is made again if the data file or
+process_sent.py has changed since.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from array import array
+from functools import lru_cache
+
+import numpy as np
+
+from process_sent import process_sent
+from ngram_freq import count_ngrams
+from vocabulary import Vocabulary
+from dedup import FingerprintSet
+
+
+# The number of words (and line offsets) written to the cache at once
+WRITE_BUFFER_SIZE = 65536
+
+# The number of lines counted at once when reading the cache
+READ_CHUNK_LINES = 1000000
+
+# The files of the cache (the metadata is written last)
+CACHE_FILES = ("vocab.txt", "ids.bin", "offsets.bin", "lines.bin", "deleted.json",
+               "meta.json")
+
+
+
+def source_info(data_file):
+    """
+    Describes the data file and the version of process_sent,
+    to tell whether a cache is still up to date.
+
+    Parameters
+    ----------
+    data_file : str
+        The path to the data file the cache is made from.
+
+    Returns
+    -------
+    info : dict
+        The path, size and modification time of the data file
+            and the hash of process_sent.py.
+
+    """
+    with open(inspect.getsourcefile(process_sent), "rb") as source_file:
+        process_hash = hashlib.sha256(source_file.read()).hexdigest()
+
+    data_stat = os.stat(data_file)
+
+    return {"data_file": os.path.abspath(data_file),
+            "size": data_stat.st_size,
+            "mtime": data_stat.st_mtime_ns,
+            "process_sent": process_hash}
+
+
+
+def cache_exists(cache_prefix, data_file=""):
+    """
+    Checks whether all of the files of the cache exist, and optionally
+    whether the cache was made from the current version of the data file
+    and of process_sent.
+
+    Parameters
+    ----------
+    cache_prefix : str
+        The path to the cache files without the extensions.
+    data_file : str, optional
+        The path to the data file the cache should be made from.
+        The default is "" (= only check that the cache exists).
+
+    Returns
+    -------
+    bool
+        True if the cache exists (and is up to date).
+
+    """
+    if not all(os.path.exists(f"{cache_prefix}.{cache_file}")
+               for cache_file in CACHE_FILES):
+        return False
+
+    if not data_file:
+        return True
+
+    with open(f"{cache_prefix}.meta.json", encoding="utf-8") as meta_file:
+        return json.load(meta_file) == source_info(data_file)
+
+
+
+def write_cache(data_lines, cache_prefix, data_file, cache_size=0):
+    """
+    Processes the data and writes it into the cache.
+
+    Parameters
+    ----------
+    data_lines : iterable of strings
+        The lines (sentences) from the data file.
+    cache_prefix : str
+        The path to the cache files without the extensions.
+    data_file : str
+        The path to the data file the lines are read from
+            (recorded in the metadata of the cache).
+    cache_size : int, optional
+        The number of processed lines to keep in an LRU cache in memory
+            (see count_freq). The default is 0 (= no cache).
+
+    Returns
+    -------
+    None.
+
+    """
+    # Create the folder for the cache if it does not exist yet
+    directory = os.path.dirname(cache_prefix)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    # Invalidate the old cache before overwriting any of its files
+    if os.path.exists(f"{cache_prefix}.meta.json"):
+        os.remove(f"{cache_prefix}.meta.json")
+
+    meta = source_info(data_file)
+
+    vocab = Vocabulary()
+    deleted = set()
+
+    if cache_size:
+        process = lru_cache(maxsize=cache_size)(process_sent)
+    else:
+        process = process_sent
+
+    words = []
+    offsets = array("q", [0])
+    n_words = 0
+
+    with open(f"{cache_prefix}.ids.bin.tmp", "wb") as ids_file, \
+         open(f"{cache_prefix}.offsets.bin.tmp", "wb") as offsets_file, \
+         open(f"{cache_prefix}.lines.bin.tmp", "wb") as lines_file:
+        for sent in data_lines:
+            # Fingerprint the raw line for the duplicate check
+            # (the lines are compared like in count_freq)
+            lines_file.write(hashlib.blake2b(sent.strip().encode(),
+                                             digest_size=8).digest())
+
+            # Keep track of deleted characters for the statistics
+            processed_sent, del_set = process(sent, True)
+            deleted.update(del_set)
+
+            # Remove empty strings
+            line_words = [word for word in processed_sent if word]
+            words.extend(line_words)
+
+            n_words += len(line_words)
+            offsets.append(n_words)
+
+            # Look up the IDs of the buffered words at once
+            if len(words) >= WRITE_BUFFER_SIZE:
+                vocab.get_ids(words).astype(np.int32).tofile(ids_file)
+                words = []
+
+            if len(offsets) >= WRITE_BUFFER_SIZE:
+                offsets.tofile(offsets_file)
+                offsets = array("q")
+
+        vocab.get_ids(words).astype(np.int32).tofile(ids_file)
+        offsets.tofile(offsets_file)
+
+    with open(f"{cache_prefix}.vocab.txt.tmp", "w", encoding="utf-8") as vocab_file:
+        for word in vocab.get_units():
+            vocab_file.write(word + "\n")
+
+    with open(f"{cache_prefix}.deleted.json.tmp", "w", encoding="utf-8") as deleted_file:
+        json.dump(sorted(deleted), deleted_file, ensure_ascii=False)
+
+    with open(f"{cache_prefix}.meta.json.tmp", "w", encoding="utf-8") as meta_file:
+        json.dump(meta, meta_file, ensure_ascii=False)
+
+    # Only put the files in place once all of them are complete
+    for cache_file in CACHE_FILES:
+        os.replace(f"{cache_prefix}.{cache_file}.tmp", f"{cache_prefix}.{cache_file}")
+
+
+
+def load_cache(cache_prefix):
+    """
+    Loads the cache. The word IDs and the line offsets are memory-mapped.
+
+    Parameters
+    ----------
+    cache_prefix : str
+        The path to the cache files without the extensions.
+
+    Raises
+    ------
+    Exception
+        If the cache does not exist.
+
+    Returns
+    -------
+    words : list of strings
+        The words in the order of their IDs.
+    ids : numpy memmap of int32
+        The word IDs of the whole corpus.
+    offsets : numpy memmap of int64
+        The index of the first word of every line in ids
+            (the last value is the total number of words).
+    line_hashes : numpy memmap of uint64
+        The fingerprint of every raw line.
+    deleted : list of strings
+        The characters removed by process_sent.
+
+    """
+    if not cache_exists(cache_prefix):
+        raise Exception(f"The corpus cache {cache_prefix} does not exist.")
+
+    with open(f"{cache_prefix}.vocab.txt", encoding="utf-8") as vocab_file:
+        words = vocab_file.read().split("\n")[:-1]
+
+    with open(f"{cache_prefix}.deleted.json", encoding="utf-8") as deleted_file:
+        deleted = json.load(deleted_file)
+
+    offsets = np.memmap(f"{cache_prefix}.offsets.bin", dtype=np.int64, mode="r")
+
+    # An empty file can't be memory-mapped
+    if offsets[-1]:
+        ids = np.memmap(f"{cache_prefix}.ids.bin", dtype=np.int32, mode="r")
+    else:
+        ids = np.zeros(0, dtype=np.int32)
+
+    # An empty file can't be memory-mapped
+    if len(offsets) > 1:
+        line_hashes = np.memmap(f"{cache_prefix}.lines.bin", dtype=np.uint64, mode="r")
+    else:
+        line_hashes = np.zeros(0, dtype=np.uint64)
+
+    return words, ids, offsets, line_hashes, deleted
+
+
+
+def cache_freq(cache_prefix, count_character=False, count_bigram=False,
+               dedup=False, on_new_word=None, stats=False):
+    """
+    Counts the frequencies from the cache.
+    Takes the same options as count_freq and returns the same frequencies.
+
+    Parameters
+    ----------
+    cache_prefix : str
+        The path to the cache files without the extensions.
+    count_character : bool, optional
+        Set to True if the information about word character frequency is to
+            be added. The default is False.
+    count_bigram : bool, optional
+        Set to True if the information about bigram frequency within a word
+            is to be added. The default is False.
+    dedup : bool, optional
+        Set to True to count every distinct line only once.
+        The raw lines are compared exactly by their 64-bit fingerprint
+            (count_freq uses a Bloom filter on the same text instead).
+        The default is False.
+    on_new_word : function, optional
+        The function to call with every word in the cache before counting
+            (see count_freq). The default is None.
+    stats : bool, optional
+        Set to True to have some statistical information about the corpus
+            printed out. The default is False.
+
+    Returns
+    -------
+    word_freq : Vocabulary
+        Vocabulary containing every word and its frequency.
+    character_freq : dictionary
+        Dictionary containing word character to its frequency
+            if count_character is True.
+    bigram_freq : Vocabulary
+        Vocabulary containing bigram to its frequency if count_bigram is True.
+
+    """
+    words, ids, offsets, line_hashes, deleted = load_cache(cache_prefix)
+    n_lines = len(offsets) - 1
+
+    # All of the words are known before counting
+    if on_new_word is not None:
+        for word in words:
+            on_new_word(word)
+
+    if dedup:
+        seen_lines = FingerprintSet()
+        distinct_lines = 0
+
+    # Count the words chunk by chunk
+    counts = np.zeros(len(words), dtype=np.int64)
+
+    for start in range(0, n_lines, READ_CHUNK_LINES):
+        end = min(start + READ_CHUNK_LINES, n_lines)
+        chunk_ids = np.asarray(ids[offsets[start]:offsets[end]])
+
+        if dedup:
+            # Keep only the first occurrence of every line
+            keep_lines = seen_lines.add(np.asarray(line_hashes[start:end]))
+            distinct_lines += int(keep_lines.sum())
+
+            line_lens = np.diff(offsets[start:end+1])
+            chunk_ids = chunk_ids[np.repeat(keep_lines, line_lens)]
+
+        counts += np.bincount(chunk_ids, minlength=len(words))
+
+    # Remove the words that only occur in the duplicate lines
+    counted = np.flatnonzero(counts)
+    word_freq = Vocabulary.from_arrays([words[idx] for idx in counted],
+                                       counts[counted])
+
+    character_freq = {}
+    bigram_freq = {}
+
+    if count_character:
+        # Count the characters of every word type weighted by its frequency
+        for word, freq in word_freq.items():
+            for character in word:
+                # Skip spaces and punctuation
+                if character in " -'":
+                    continue
+                character_freq[character] = character_freq.get(character, 0) + freq
+
+    if count_bigram:
+        bigram_freq = count_ngrams(word_freq, n=2)["all"]
+
+    if stats:
+        print("Removed characters:\n", set(deleted), "\n")
+
+        if dedup:
+            duplicate_lines = n_lines - distinct_lines
+            duplicate_rate = round(100 * duplicate_lines / max(n_lines, 1), 2)
+            print(f"The number of duplicate lines in the corpus is {duplicate_lines} out of {n_lines} ({duplicate_rate}%).")
+            print()
+
+    return word_freq, character_freq, bigram_freq
@@ -4,12 +4,26 @@
 Counting different types of frequencies.
 """
 
+from functools import lru_cache
+
 from process_sent import process_sent
+from vocabulary import Vocabulary
+from dedup import ScalableBloomFilter
+
+
+
+# The initial capacity of the duplicate filter if the number of lines isn't
+# known in advance (e.g. streamed data); the filter grows as it fills up
+DEDUP_CAPACITY = 1000000
+
+# Longer lines are rarely repeated and would only push
+# the short frequent lines out of the cache
+CACHE_MAX_LEN = 50
 
 
 
 def count_freq(data_lines, count_character=False, count_bigram=False,
-               stats=False):
+               dedup=False, cache_size=0, on_new_word=None, stats=False):
     """
     Counts the frequency of every word in the data.
     Optionally counts the frequency of every character in the data.
@@ -17,21 +31,35 @@ def count_freq(data_lines, count_character=False, count_bigram=False,
     Parameters
     ----------
     data_lines : list of strings
-        A list of lines (sentences) from the data file.
+        A list (or any iterable) of lines (sentences) from the data file.
     count_character : bool, optional
         Set to True if the information about word character frequency is to be added. 
         The default is False.
     count_bigram : bool, optional
         Set to True if the information about bigram frequency within a word
             is to be added. The default is False.
+    dedup : bool, optional
+        Set to True to count every distinct line only once.
+        The lines are compared by their 64-bit fingerprint stored in a
+            Bloom filter that grows with the data, so a small share of
+            distinct lines (about 0.1%) can be mistaken for duplicates.
+        The default is False.
+    cache_size : int, optional
+        The number of processed lines to keep in an LRU cache, so that
+            repeated lines (e.g. "Yeah.", "What?") are not processed again.
+        Only lines of up to CACHE_MAX_LEN characters are cached.
+        The counts are not affected. The default is 0 (= no cache).
+    on_new_word : function, optional
+        The function to call with every new word when it first appears
+            in the data (e.g. SpellCheckCache.submit). The default is None.
     stats : bool, optional
         Set to True to have some statistical information about the corpus 
             printed out. The default is False.
 
     Returns
     -------
-    word_freq : dictionary
-        Dictionary containing word to its frequency.
+    word_freq : Vocabulary
+        Vocabulary containing every word and its frequency.
     character_freq : dictionary
         Dictionary containing word character to its frequency 
             if count_character is True.
@@ -39,16 +67,40 @@ def count_freq(data_lines, count_character=False, count_bigram=False,
         Dictionary containing bigram to its frequency if count_bigram is True.
 
     """
-    word_freq = {}
+    word_freq = Vocabulary(on_new_unit=on_new_word)
     character_freq = {}
     bigram_freq = {}
     
     # Keep track of deleted characters
     deleted = set()
     
+    if dedup:
+        # Size the filter for the number of lines in the data
+        if hasattr(data_lines, "__len__"):
+            seen_lines = ScalableBloomFilter(len(data_lines))
+        else:
+            seen_lines = ScalableBloomFilter(DEDUP_CAPACITY)
+        total_lines = 0
+        duplicate_lines = 0
+    
+    if cache_size:
+        # The processed lines are only read below, so they can be shared
+        cached_process_sent = lru_cache(maxsize=cache_size)(process_sent)
+    
     # Go through every sentence in the data
     for sent in data_lines:
-        processed_sent, del_set = process_sent(sent, stats)
+        
+        # Skip the lines that have already been counted
+        if dedup:
+            total_lines += 1
+            if seen_lines.add(sent.strip().encode()):
+                duplicate_lines += 1
+                continue
+        
+        if cache_size and len(sent) <= CACHE_MAX_LEN:
+            processed_sent, del_set = cached_process_sent(sent, stats)
+        else:
+            processed_sent, del_set = process_sent(sent, stats)
         
         deleted.update(del_set)
         
@@ -59,11 +111,8 @@ def count_freq(data_lines, count_character=False, count_bigram=False,
             if not word:
                 continue
             
-            # Create an entry for the word in the frequency dictionary
-            # if it doesn't exist yet
-            word_freq.setdefault(word, 0)
-            # Count the word
-            word_freq[word] += 1
+            # Count the word (adds it to the vocabulary if it's new)
+            word_freq.add(word)
             
             if count_character:
                 # Go through every character in the given word
@@ -90,6 +139,18 @@ def count_freq(data_lines, count_character=False, count_bigram=False,
     
     if stats:
         print("Removed characters:\n", deleted, "\n")
+        
+        if dedup:
+            duplicate_rate = round(100 * duplicate_lines / max(total_lines, 1), 2)
+            print(f"The number of duplicate lines in the corpus is {duplicate_lines} out of {total_lines} ({duplicate_rate}%).")
+            print()
+        
+        if cache_size:
+            cache_info = cached_process_sent.cache_info()
+            lookups = cache_info.hits + cache_info.misses
+            hit_rate = round(100 * cache_info.hits / max(lookups, 1), 2)
+            print(f"The tokenisation cache hit rate is {hit_rate}% ({cache_info.hits} out of {lookups} lookups, cache size {cache_info.maxsize}).")
+            print()
     
     return word_freq, character_freq, bigram_freq
 
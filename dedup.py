@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+# Authors: Elizaveta Sineva, Sara Chilson
+"""
+Detect duplicate lines in the data.
+
+The same subtitle line is often repeated within a film and across several
+subtitle versions of the same film. The lines are fingerprinted with a
+64-bit hash and stored in a Bloom filter, so the memory used stays bounded
+no matter how many lines the data has. If the number of lines isn't known
+in advance, the filter grows in slices as it fills up (see
+ScalableBloomFilter), so that the false positive rate stays bounded too.
+The fingerprints of whole chunks of lines (e.g. from the corpus cache) can
+also be compared exactly with a FingerprintSet.
+"""
+
+import hashlib
+import math
+
+import numpy as np
+
+
+# The factor by which the capacity of every new slice grows
+SLICE_GROWTH = 2
+
+# The factor by which the error rate of every new slice shrinks
+SLICE_TIGHTENING = 0.5
+
+
+
+def fingerprint(item):
+    """
+    Computes the 64-bit fingerprint of an item as two 32-bit halves.
+
+    Parameters
+    ----------
+    item : bytes
+        The item to fingerprint.
+
+    Returns
+    -------
+    hash_1 : int
+        The first half of the fingerprint.
+    hash_2 : int
+        The second half of the fingerprint (always odd).
+
+    """
+    digest = hashlib.blake2b(item, digest_size=8).digest()
+    hash_1 = int.from_bytes(digest[:4], "little")
+    hash_2 = int.from_bytes(digest[4:], "little") | 1
+
+    return hash_1, hash_2
+
+
+class BloomFilter:
+    """
+    A Bloom filter over byte strings.
+
+    A Bloom filter never misses a line that has already been seen, but can
+    report a new line as seen with the probability error_rate.
+
+    Parameters
+    ----------
+    capacity : int
+        The expected number of distinct items.
+    error_rate : float, optional
+        The acceptable false positive rate once capacity items have been
+            added. The default is 0.001.
+
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.n_items = 0
+
+        # Optimal number of bits and hash functions for the given capacity
+        self.n_bits = math.ceil(-self.capacity * math.log(error_rate)
+                                / math.log(2)**2)
+        self.n_hashes = max(1, round(self.n_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+
+    def add(self, item):
+        """
+        Adds an item to the filter.
+
+        Parameters
+        ----------
+        item : bytes
+            The item to add.
+
+        Returns
+        -------
+        seen : bool
+            True if the item has (probably) already been added before.
+
+        """
+        return self.add_fingerprint(fingerprint(item))
+
+    def add_fingerprint(self, item_hash, add=True):
+        """
+        Adds an item to the filter by its fingerprint.
+
+        Parameters
+        ----------
+        item_hash : (int, int)
+            The fingerprint of the item (see fingerprint).
+        add : bool, optional
+            Set to False to only check the item without adding it.
+            The default is True.
+
+        Returns
+        -------
+        seen : bool
+            True if the item has (probably) already been added before.
+
+        """
+        # Derive all bit positions from one 64-bit fingerprint
+        # (double hashing with its two 32-bit halves)
+        hash_1, hash_2 = item_hash
+
+        seen = True
+        for idx in range(self.n_hashes):
+            pos = (hash_1 + idx*hash_2) % self.n_bits
+            byte_idx, mask = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte_idx] & mask:
+                if not add:
+                    return False
+                seen = False
+                self.bits[byte_idx] |= mask
+
+        if not seen:
+            self.n_items += 1
+
+        return seen
+
+
+class ScalableBloomFilter:
+    """
+    A Bloom filter that grows with the number of items.
+
+    Once the current slice holds its capacity, a new slice with
+    SLICE_GROWTH times the capacity and SLICE_TIGHTENING times the error
+    rate is added. An item is seen if any of the slices has it, so the
+    false positive rates of the slices add up to about error_rate
+    no matter how many items are added.
+
+    Parameters
+    ----------
+    capacity : int
+        The expected number of distinct items (the capacity of the first
+            slice).
+    error_rate : float, optional
+        The acceptable false positive rate. The default is 0.001.
+
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.error_rate = error_rate
+        self.slices = []
+        self.add_slice(capacity)
+
+    def add_slice(self, capacity):
+        """
+        Adds a new (empty) slice to the filter.
+
+        Parameters
+        ----------
+        capacity : int
+            The expected number of distinct items in the slice.
+
+        Returns
+        -------
+        None.
+
+        """
+        slice_error = (self.error_rate * (1 - SLICE_TIGHTENING)
+                       * SLICE_TIGHTENING**len(self.slices))
+        self.slices.append(BloomFilter(capacity, slice_error))
+
+    def add(self, item):
+        """
+        Adds an item to the filter.
+
+        Parameters
+        ----------
+        item : bytes
+            The item to add.
+
+        Returns
+        -------
+        seen : bool
+            True if the item has (probably) already been added before.
+
+        """
+        item_hash = fingerprint(item)
+
+        # The older slices are full and are only checked
+        for old_slice in self.slices[:-1]:
+            if old_slice.add_fingerprint(item_hash, add=False):
+                return True
+
+        current = self.slices[-1]
+        seen = current.add_fingerprint(item_hash)
+
+        if current.n_items >= current.capacity:
+            self.add_slice(SLICE_GROWTH * current.capacity)
+
+        return seen
+
+
+class FingerprintSet:
+    """
+    An exact set of 64-bit fingerprints for finding the first occurrences
+    in chunks of fingerprints.
+
+    The fingerprints are kept in sorted NumPy runs (8 bytes per distinct
+    fingerprint). The new fingerprints of every chunk form a new run, and
+    the runs of similar size are merged, so there are never more than
+    about log2(number of chunks) runs to search.
+
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def add(self, hashes):
+        """
+        Adds a chunk of fingerprints to the set.
+
+        Parameters
+        ----------
+        hashes : numpy array of uint64
+            The fingerprints of the chunk.
+
+        Returns
+        -------
+        is_new : numpy array of bool
+            True for the first occurrence of every fingerprint that wasn't
+                in the set yet.
+
+        """
+        unique_hashes, first = np.unique(hashes, return_index=True)
+
+        new = np.ones(len(unique_hashes), dtype=bool)
+        for run in self.runs:
+            pos = np.minimum(np.searchsorted(run, unique_hashes), len(run) - 1)
+            new &= run[pos] != unique_hashes
+
+        is_new = np.zeros(len(hashes), dtype=bool)
+        is_new[first[new]] = True
+
+        # Merge the new fingerprints with the runs that aren't much larger
+        run = unique_hashes[new]
+        while self.runs and len(self.runs[-1]) < 2 * len(run):
+            run = np.sort(np.concatenate([self.runs.pop(), run]))
+        if len(run):
+            self.runs.append(run)
+
+        return is_new
@@ -4,9 +4,59 @@
 Export data into a certain format.
 """
 
+import importlib
 import os
 
 
+# Options of the compressors for the compressed file types
+# (zstd uses all available cores, gzip is single-threaded)
+COMPRESSION = {"gz":  {"method": "gzip", "compresslevel": 6, "mtime": 0},
+               "zst": {"method": "zstd", "level": 3, "threads": -1}}
+
+# The packages the compressors need that are not part of Python itself
+COMPRESSION_PACKAGES = {"zst": "zstandard"}
+
+
+def check_file_types(file_types):
+    """
+    Checks that the data can be exported into the given format(s),
+    so that an unsupported format is found before the data is counted.
+
+    Parameters
+    ----------
+    file_types : str
+        The extension(s) of the files to export the data into
+            (see export_data).
+
+    Raises
+    ------
+    Exception
+        If a file type or compression is not supported, or the package
+            needed for the compression is not installed.
+
+    Returns
+    -------
+    None.
+
+    """
+    for file_type in file_types.split("|"):
+        file_type, _, compression = file_type.partition(".")
+        
+        if file_type not in ("txt", "csv", "xlsx"):
+            raise Exception(f"Unsupported file type {file_type}.")
+        
+        if compression:
+            if compression not in COMPRESSION or file_type == "xlsx":
+                raise Exception(f"Unsupported file type {file_type}.{compression}.")
+            
+            package = COMPRESSION_PACKAGES.get(compression)
+            if package:
+                try:
+                    importlib.import_module(package)
+                except ImportError:
+                    raise Exception(f"The {package} package is needed to export {file_type}.{compression} files.")
+
+
 def export_data(df, file_name, file_types="txt"):
     """
     Exports the data into a file with a given format(s).
@@ -21,6 +71,9 @@ def export_data(df, file_name, file_types="txt"):
     file_types : str, optional
         The extension of the file to export the data into.
         The available extensions: "txt","csv", "xlsx". 
+        The "txt" and "csv" files can also be compressed by adding ".gz"
+            or ".zst" (zst requires the zstandard package),
+            e.g. "txt.gz", "csv.zst".
         The default is "txt".
         To export data into more than one file type, use | to separate
            extensions.
@@ -29,13 +82,16 @@ def export_data(df, file_name, file_types="txt"):
     Raises
     ------
     Exception
-        If the requested file type is not supported by the function.
+        If the requested file type is not supported by the function
+            (see check_file_types).
 
     Returns
     -------
     None.
 
     """
+    check_file_types(file_types)
+    
     # Create the folder for the data if it does not exist yet
     directory = "/".join(file_name.split("/")[:-1])
     if not os.path.exists(directory):
@@ -45,13 +101,17 @@ def export_data(df, file_name, file_types="txt"):
     for file_type in file_types.split("|"):
         curr_file_name = f"{file_name}.{file_type}"
         
+        # The rows are written through a streaming compressor if necessary
+        file_type, _, compression = file_type.partition(".")
+        compression = COMPRESSION.get(compression)
+        
         if file_type == "txt":
             df.to_csv(curr_file_name, sep='\t', index=False,
-                      encoding="utf-8")
+                      encoding="utf-8", compression=compression)
         
         elif file_type == "csv":
             df.to_csv(curr_file_name, sep=',', index=False,
-                      encoding="utf-8")
+                      encoding="utf-8", compression=compression)
         
         elif file_type == "xlsx":
             # Maximum size possible for excel: 1048576, 16384
@@ -21,12 +21,27 @@ def extract_data(gz_file):
     lines: list of strings
         A list of lines from the data.
     """
-    lines = []
+    lines = list(iter_data(gz_file))
     
+    return lines
+
+
+def iter_data(gz_file):
+    """
+    Iterate over the lines of a given gz file without keeping them in memory.
+
+    Parameters
+    ----------
+    gz_file : string
+        The path to the data file of gz type.
+
+    Yields
+    ------
+    decoded_line : string
+        A line from the data.
+    """
     with gzip.open(gz_file) as f:
         for line in f:
             decoded_line = line.decode()
-            lines.append(decoded_line)
-    
-    return lines
+            yield decoded_line
 
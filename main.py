@@ -15,12 +15,21 @@ Resources and Evaluation (LREC 2016)
 """
 
 import argparse
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from extract_data import extract_data
+from extract_data import extract_data, iter_data
 from count_freq import count_freq
+from sample_data import sample_freq
+from pipeline import pipeline_freq
 from order_data import order_data
-from export_data import export_data
+from export_data import export_data, check_file_types
+from ngram_freq import count_ngrams
+from phoneme_freq import count_phonemes
+from corpus_cache import cache_exists, write_cache, cache_freq
+from collect_ipa import collect_ipa
+from spell_checker import SpellCheckCache
 
 
 ABBR2FULL = {'af': 'afrikaans', 
@@ -87,6 +96,9 @@ ABBR2ASPELL = {'pt':    'pt_PT',
 
 def main(gz_data_file, file_types="txt|xlsx", ipa_dir="",
          count_character=False, count_bigram=False, spell_check=False,
+         dedup=False, cache_size=0, sample=False, pipeline=False,
+         ngram=0, positional=False, phoneme=False, top=0, min_freq=0,
+         corpus_cache="", checkpoints=10, sample_top=1000, threshold=0.999,
          stats=False):
     """
     Collects frequencies from the OpenSubtitles data in a given language.
@@ -97,7 +109,8 @@ def main(gz_data_file, file_types="txt|xlsx", ipa_dir="",
         The path to the data file with the gz extension.
     file_types : str, optional
         The extension of the file to export the data into.
-        The available extensions: "txt","csv", "xlsx".
+        The available extensions: "txt","csv", "xlsx",
+            as well as the compressed "txt.gz", "txt.zst", "csv.gz", "csv.zst".
         To export data into more than one file type, use | to separate
            extensions.
          The default is "txt|xlsx".
@@ -113,6 +126,57 @@ def main(gz_data_file, file_types="txt|xlsx", ipa_dir="",
     spell_check : bool, optional
         Set to True to filter the words using Aspell spell checker.
         You can find the spell checker at aspell.net.
+    dedup : bool, optional
+        Set to True to count every distinct line of the data only once.
+        The lines are compared with a Bloom filter (about 0.1% of the
+            distinct lines are dropped as false duplicates), or exactly
+            by their fingerprints with corpus_cache (the output files
+            then get the .dedup_exact suffix instead of .dedup).
+        The default is False.
+    cache_size : int, optional
+        The number of processed lines to keep in a cache so that repeated
+            short lines are not processed again. The default is 0 (= no cache).
+    sample : bool, optional
+        Set to True to count the data progressively on evenly spread samples,
+            report how stable the top ranks are between the checkpoints and
+            stop once they have converged. The default is False.
+    pipeline : bool, optional
+        Set to True to decompress the data in a background thread while
+            it is being counted. The default is False.
+    ngram : int, optional
+        The number of characters in the character n-grams (within a word)
+            to count, e.g. 3 for trigrams (1 only with positional).
+            The default is 0 (= no n-grams).
+    positional : bool, optional
+        Set to True to count the n-grams separately for the start, the
+            middle and the end of the word (requires ngram).
+            The default is False.
+    phoneme : bool, optional
+        Set to True to count the phoneme, phoneme bigram and word length
+            (in phonemes) frequencies in the IPA data. Requires ipa_dir.
+        The phonemes are counted from all of the IPA words, also with top
+            or min_freq. The default is False.
+    top : int, optional
+        Only export the given number of the most frequent units.
+        The default is 0 (= all units).
+    min_freq : int, optional
+        Only export the units with at least the given frequency.
+        The default is 0 (= all units).
+    corpus_cache : str, optional
+        Provide path to the directory with the processed (tokenised) data.
+        If the data of the language isn't there yet (or the data file or
+            process_sent.py has changed since), it is processed and saved
+            there first. The frequencies are then counted from the saved
+            data. The default is "" (= no cache).
+    checkpoints : int, optional
+        The number of samples the data is split into in the sampling mode.
+        The default is 10.
+    sample_top : int, optional
+        The number of the most frequent words compared between the samples
+            in the sampling mode. The default is 1000.
+    threshold : float, optional
+        The rank correlation at which the sampling mode stops (above 1 =
+            always count all of the data). The default is 0.999.
     stats : bool, optional
         Set to True to have some statistical information about the corpus 
             printed out. The default is False.
@@ -122,6 +186,9 @@ def main(gz_data_file, file_types="txt|xlsx", ipa_dir="",
     None.
 
     """
+    # Make sure the results can be exported before counting them
+    check_file_types(file_types)
+    
     # Extract the language of the data
     split_path = gz_data_file.split("/")
     lang_abbr = split_path[-1].split(".")[0]
@@ -133,15 +200,98 @@ def main(gz_data_file, file_types="txt|xlsx", ipa_dir="",
         assert lang not in NOT_IN_ASPELL, f"You have added the option of using a spell checker; however, there is no spell checker for {lang.capitalize()}"
         spell_check = ABBR2ASPELL.get(lang_abbr, lang_abbr)
     
-    # Extract the raw data from the file
-    data_lines = extract_data(gz_data_file)
-
+    if phoneme:
+        assert ipa_dir, "The phoneme frequencies can only be counted if the IPA information is added"
+    
+    assert ngram >= 0, "The n-grams must have at least one character"
+    assert ngram or not positional, "The positional n-gram frequencies can only be counted if the n-gram length is added"
+    assert ngram != 1 or positional, "The 1-grams without positions are the character frequencies (use the count character option)"
+    
+    # Load the IPA information in the background while the data is counted
+    if ipa_dir:
+        ipa_executor = ThreadPoolExecutor(max_workers=1)
+        ipa_future = ipa_executor.submit(collect_ipa, lang, ipa_dir)
+    
+    # Spell check the words in the background as soon as they appear
+    # in the data (unless only the top of the words is spell checked
+    # and the phonemes aren't counted from all of the words)
+    spell_cache = None
+    on_new_word = None
+    if spell_check and (phoneme or not top and not min_freq):
+        spell_cache = SpellCheckCache(spell_check)
+        on_new_word = spell_cache.submit
+    
     # Extract the frequencies for each word in the data
-    word_freq, character_freq, bigram_freq = count_freq(data_lines, 
+    if corpus_cache:
+        assert not sample and not pipeline, "The corpus cache can't be used in the sampling or the pipeline mode"
+        cache_prefix = os.path.join(corpus_cache, lang_abbr)
+        
+        # Process the raw data only once (and again if the data or
+        # the processing has changed)
+        if not cache_exists(cache_prefix, gz_data_file):
+            write_cache(iter_data(gz_data_file), cache_prefix, gz_data_file,
+                        cache_size=cache_size)
+        
+        word_freq, character_freq, bigram_freq = cache_freq(cache_prefix,
                                                 count_character=count_character,
                                                 count_bigram=count_bigram,
+                                                dedup=dedup,
+                                                on_new_word=on_new_word,
                                                 stats=stats)
     
+    elif pipeline:
+        assert not sample, "The sampling mode can't be used in the pipeline mode"
+        # Decompress and count the data at the same time
+        word_freq, character_freq, bigram_freq = pipeline_freq(gz_data_file,
+                                                count_character=count_character,
+                                                count_bigram=count_bigram,
+                                                dedup=dedup,
+                                                cache_size=cache_size,
+                                                on_new_word=on_new_word,
+                                                stats=stats)
+    
+    elif sample:
+        assert not dedup, "The sampling mode does not support removing duplicate lines"
+        assert checkpoints >= 1 and sample_top >= 1, "The sampling mode needs at least one checkpoint and one top word"
+        # Extract the raw data from the file
+        data_lines = extract_data(gz_data_file)
+        
+        # Export the preliminary word frequencies at every checkpoint
+        checkpoint_file = f"data/word_freq/{lang}.word.freq.sample.checkpoint"
+        word_freq, character_freq, bigram_freq = sample_freq(data_lines,
+                                                n_checkpoints=checkpoints,
+                                                top_n=sample_top,
+                                                threshold=threshold,
+                                                checkpoint_file=checkpoint_file,
+                                                file_types=file_types,
+                                                count_character=count_character,
+                                                count_bigram=count_bigram,
+                                                cache_size=cache_size,
+                                                on_new_word=on_new_word,
+                                                stats=stats)
+    
+    else:
+        # Extract the raw data from the file
+        data_lines = extract_data(gz_data_file)
+        
+        word_freq, character_freq, bigram_freq = count_freq(data_lines, 
+                                                count_character=count_character,
+                                                count_bigram=count_bigram,
+                                                dedup=dedup,
+                                                cache_size=cache_size,
+                                                on_new_word=on_new_word,
+                                                stats=stats)
+    
+    # Stop the background spell check before the words are filtered;
+    # the words that are still left are checked on demand
+    if spell_cache is not None:
+        spell_cache.stop()
+    
+    ipa_dict = None
+    if ipa_dir:
+        ipa_dict = ipa_future.result()
+        ipa_executor.shutdown()
+    
     data_types = {"word": word_freq}
     
     if count_character:
@@ -153,6 +303,21 @@ def main(gz_data_file, file_types="txt|xlsx", ipa_dir="",
     if ipa_dir:
         data_types["ipa"] = word_freq
     
+    # The versions of the data are marked in the file names
+    suffix = ""
+    if top:
+        suffix += f".top{top}"
+    if min_freq:
+        suffix += f".min{min_freq}"
+    if spell_check:
+        suffix += ".spell_checked"
+    if dedup:
+        # The corpus cache compares the lines exactly, the other modes
+        # with a Bloom filter (see count_freq)
+        suffix += ".dedup_exact" if corpus_cache else ".dedup"
+    if sample:
+        suffix += ".sample"
+    
     for data_type in data_types:
         ipa_info = ipa_dir if data_type == "ipa" else ""
         data_type = "word" if data_type == "ipa" else data_type
@@ -160,17 +325,60 @@ def main(gz_data_file, file_types="txt|xlsx", ipa_dir="",
         # Organize the data
         ordered_freq = order_data(data_types[data_type], ipa_dir=ipa_info, 
                                   lang=lang, unit_name=data_type.capitalize(),
-                                  spell_check=spell_check, stats=stats)
+                                  spell_check=spell_check, top=top,
+                                  min_freq=min_freq,
+                                  ipa_dict=ipa_dict if ipa_info else None,
+                                  spell_cache=spell_cache, stats=stats)
                 
         # Export word frequency data in a file
         folder_name = f"data/{data_type}_freq/"
-        file_name = folder_name + lang + f".{data_type}.freq"
-        if spell_check:
-            file_name += ".spell_checked"
+        file_name = folder_name + lang + f".{data_type}.freq" + suffix
         if ipa_info:
-            file_name += ".ipa"        
+            file_name += ".ipa"
+            # Keep the IPA data for counting the phonemes
+            # (all of the IPA words, not only the exported ones)
+            if phoneme and (top or min_freq):
+                ipa_freq = order_data(word_freq, ipa_dir=ipa_dir, lang=lang,
+                                      spell_check=spell_check,
+                                      ipa_dict=ipa_dict,
+                                      spell_cache=spell_cache)
+            else:
+                ipa_freq = ordered_freq
         export_data(ordered_freq, file_name, file_types=file_types)
+    
+    if spell_cache is not None:
+        spell_cache.close()
+    
+    if ngram:
+        # Count the n-grams within every word type weighted by its frequency
+        ngram_freqs = count_ngrams(word_freq, n=ngram, positional=positional)
         
+        for position, ngram_freq in ngram_freqs.items():
+            ordered_freq = order_data(ngram_freq, unit_name=f"{ngram}-gram",
+                                      top=top, min_freq=min_freq, stats=stats)
+            
+            file_name = f"data/ngram_freq/{lang}.{ngram}gram.freq"
+            if positional:
+                file_name += f".{position}"
+            file_name += suffix
+            export_data(ordered_freq, file_name, file_types=file_types)
+    
+    if phoneme:
+        # Count the phonemes of every word type weighted by its frequency
+        phoneme_freqs = count_phonemes(ipa_freq)
+        phoneme_types = {"phoneme": "Phoneme",
+                         "phoneme_bigram": "Phoneme bigram",
+                         "phoneme_length": "Length"}
+        
+        for (data_type, unit_name), phoneme_freq in zip(phoneme_types.items(),
+                                                        phoneme_freqs):
+            # The phonemes only come from the IPA words
+            ordered_freq = order_data(phoneme_freq, unit_name=unit_name,
+                                      top=top, min_freq=min_freq,
+                                      corpus="IPA", stats=stats)
+            
+            file_name = f"data/phoneme_freq/{lang}.{data_type}.freq" + suffix
+            export_data(ordered_freq, file_name, file_types=file_types)
         
 
 if __name__ == "__main__":
@@ -181,7 +389,7 @@ if __name__ == "__main__":
     argparser.add_argument("-f", "--file", type=str, required=True,
                             help="the path to the data file with the gz extension (required)")
     argparser.add_argument("-x", "--extension", type=str, default="txt|xlsx",
-                            help="the extension of the file to export the data into (txt/xlsx/csv); use | for several data types; default: txt|xlsx")    
+                            help="the extension of the file to export the data into (txt/xlsx/csv, compressed: txt.gz/txt.zst/csv.gz/csv.zst); use | for several data types; default: txt|xlsx")    
     argparser.add_argument("-i", "--ipa", type=str, default="",
                             help="the path to the directory containing the files with the IPA information if the information is to be added")
     argparser.add_argument("-c", "--character", default=False,
@@ -190,9 +398,40 @@ if __name__ == "__main__":
     argparser.add_argument("-b", "--bigram", default=False,
                             action=argparse.BooleanOptionalAction,
                             help="use to extract bigram frequency information (bigrams within a word)")
+    argparser.add_argument("-n", "--ngram", type=int, default=0,
+                            help="the number of characters in the character n-grams (within a word) to extract the frequency information for (1 only with --positional); default: 0 (no n-grams)")
+    argparser.add_argument("-o", "--positional", default=False,
+                            action=argparse.BooleanOptionalAction,
+                            help="use to extract the n-gram frequencies separately for the start, the middle and the end of the word (requires --ngram)")
+    argparser.add_argument("-e", "--phoneme", default=False,
+                            action=argparse.BooleanOptionalAction,
+                            help="use to extract phoneme, phoneme bigram and word length (in phonemes) frequency information from the IPA data (requires --ipa)")
     argparser.add_argument("-a", "--aspell", default=False,
                             action=argparse.BooleanOptionalAction,
                             help="filter the words using the Aspell spell checker")
+    argparser.add_argument("-d", "--dedup", default=False,
+                            action=argparse.BooleanOptionalAction,
+                            help="count every distinct line of the data only once")
+    argparser.add_argument("-k", "--cache-size", type=int, default=0,
+                            help="the number of processed short lines to cache to avoid processing repeated lines again; default: 0 (no cache)")
+    argparser.add_argument("-p", "--sample", default=False,
+                            action=argparse.BooleanOptionalAction,
+                            help="count the data progressively on evenly spread samples and stop once the top ranks have converged")
+    argparser.add_argument("-l", "--pipeline", default=False,
+                            action=argparse.BooleanOptionalAction,
+                            help="decompress the data in a background thread while it is being counted")
+    argparser.add_argument("-t", "--top", type=int, default=0,
+                            help="only export the given number of the most frequent units; default: 0 (all units)")
+    argparser.add_argument("-m", "--min-freq", type=int, default=0,
+                            help="only export the units with at least the given frequency; default: 0 (all units)")
+    argparser.add_argument("-u", "--corpus-cache", type=str, default="",
+                            help="the path to the directory with the processed data; the data is processed and saved there if it isn't there yet")
+    argparser.add_argument("--checkpoints", type=int, default=10,
+                            help="the number of samples the data is split into with --sample; default: 10")
+    argparser.add_argument("--sample-top", type=int, default=1000,
+                            help="the number of the most frequent words compared between the samples with --sample; default: 1000")
+    argparser.add_argument("--threshold", type=float, default=0.999,
+                            help="the rank correlation at which --sample stops (above 1 to count all of the data); default: 0.999")
     argparser.add_argument("-s", "--stats", default=False,
                             action=argparse.BooleanOptionalAction,
                             help="use to print out statistics about the data")
@@ -204,8 +443,14 @@ if __name__ == "__main__":
     time_start = time.time()  # keep track of the time to report on the runtime
     
     gz_data_file = args.file
-    main(gz_data_file, ipa_dir=args.ipa, count_character=args.character,
-          count_bigram=args.bigram, spell_check=args.aspell, stats=args.stats)
+    main(gz_data_file, file_types=args.extension, ipa_dir=args.ipa,
+          count_character=args.character, count_bigram=args.bigram,
+          spell_check=args.aspell, dedup=args.dedup, cache_size=args.cache_size,
+          sample=args.sample, pipeline=args.pipeline, ngram=args.ngram,
+          positional=args.positional, phoneme=args.phoneme, top=args.top,
+          min_freq=args.min_freq, corpus_cache=args.corpus_cache,
+          checkpoints=args.checkpoints, sample_top=args.sample_top,
+          threshold=args.threshold, stats=args.stats)
 
 
     ### Run the script without using arguments
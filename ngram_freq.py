@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# Authors: Elizaveta Sineva, Sara Chilson
+"""
+Counting character n-gram frequencies within words.
+
+The n-grams are counted once per word type and weighted by the frequency of
+the word, so the runtime depends on the size of the vocabulary and not on
+the size of the corpus. Every character is replaced by its index in the
+alphabet of the vocabulary, and every n-gram is packed into one integer,
+so that all n-grams can be counted at once with NumPy.
+"""
+
+import numpy as np
+
+from order_data import freq_to_arrays
+from vocabulary import Vocabulary
+
+
+# The positions of the n-grams within the word
+POSITIONS = ("initial", "medial", "final")
+
+
+
+def count_ngrams(word_freq, n=3, positional=False):
+    """
+    Counts the frequency of every character n-gram within the words.
+
+    Without positions, the words are marked with ^ at the start and $ at
+    the end (like the bigrams in count_freq), so the n-grams at the edges
+    of a word are counted separately, e.g. "^ca", "cat", "at$".
+    With positions, the n-grams are counted separately for the start
+    (initial), the middle (medial) and the end (final) of the word.
+    An n-gram that covers the whole word is both initial and final.
+
+    Parameters
+    ----------
+    word_freq : Vocabulary or dict
+        The vocabulary or dictionary containing word to its frequency.
+    n : int, optional
+        The number of characters in an n-gram. The default is 3.
+    positional : bool, optional
+        Set to True to count the n-grams separately for every position
+            within the word. The default is False.
+
+    Raises
+    ------
+    Exception
+        If n is smaller than 1 (or 1 without positions, as the 1-grams would
+            only be the characters and the ^ and $ marks), or if the n-grams
+            are too long to be packed into a 64-bit integer.
+
+    Returns
+    -------
+    ngram_freqs : dict
+        Dictionary containing the position ("initial", "medial", "final")
+            to the Vocabulary of the n-grams at that position, or "all"
+            to the Vocabulary of all n-grams if positional is False.
+
+    """
+    if n < 1:
+        raise Exception(f"The n-grams must have at least one character, not {n}.")
+    if n == 1 and not positional:
+        raise Exception("The 1-grams can only be counted with positions (see count_freq for the characters).")
+
+    words, freqs = freq_to_arrays(word_freq)
+
+    if not positional:
+        words = np.array(["^" + word + "$" for word in words], dtype=object)
+
+    # Put all of the words together into one array of characters
+    word_lens = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+    text = "".join(words).encode("utf-32-le")
+    codepoints = np.frombuffer(text, dtype=np.uint32)
+
+    # Replace every character by its index in the alphabet
+    alphabet, char_ids = np.unique(codepoints, return_inverse=True)
+    bits = max(1, int(len(alphabet) - 1).bit_length())
+    if bits * n > 63:
+        raise Exception(f"The {n}-grams over {len(alphabet)} characters are too long to be counted.")
+
+    # The word and the position within the word of every character
+    word_ids = np.repeat(np.arange(len(words)), word_lens)
+    word_starts = np.cumsum(word_lens) - word_lens
+    char_pos = np.arange(len(char_ids)) - word_starts[word_ids]
+
+    # Only keep the n-grams that start and end within the same word
+    n_starts = max(len(char_ids) - n + 1, 0)
+    starts = np.flatnonzero(char_pos[:n_starts] + n <= word_lens[word_ids[:n_starts]])
+
+    # Pack the characters of every n-gram into one integer
+    keys = np.zeros(len(starts), dtype=np.int64)
+    for idx in range(n):
+        keys = (keys << bits) | char_ids[starts + idx].astype(np.int64)
+
+    weights = freqs[word_ids[starts]]
+
+    if positional:
+        ngram_pos = char_pos[starts]
+        ngram_word_lens = word_lens[word_ids[starts]]
+        is_initial = ngram_pos == 0
+        is_final = ngram_pos + n == ngram_word_lens
+        selections = {"initial": is_initial,
+                      "medial": ~is_initial & ~is_final,
+                      "final": is_final}
+    else:
+        selections = {"all": np.ones(len(keys), dtype=bool)}
+
+    ngram_freqs = {}
+
+    for position, selected in selections.items():
+        ngram_freqs[position] = sum_ngrams(keys[selected], weights[selected],
+                                           alphabet, bits, n)
+
+    return ngram_freqs
+
+
+
+def sum_ngrams(keys, weights, alphabet, bits, n):
+    """
+    Sums up the frequencies of the packed n-grams and unpacks them.
+
+    Parameters
+    ----------
+    keys : numpy array of int64
+        The packed n-gram of every occurrence.
+    weights : numpy array of int64
+        The frequency of every occurrence.
+    alphabet : numpy array of uint32
+        The codepoints of the characters in the order of their index.
+    bits : int
+        The number of bits used for every character in the packed n-gram.
+    n : int
+        The number of characters in an n-gram.
+
+    Returns
+    -------
+    ngram_freq : Vocabulary
+        Vocabulary containing every n-gram and its frequency.
+
+    """
+    # Sum up the frequencies of the same n-grams
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    is_new = np.ones(len(keys), dtype=bool)
+    is_new[1:] = keys[1:] != keys[:-1]
+    group_starts = np.flatnonzero(is_new)
+
+    ngram_keys = keys[group_starts]
+    if len(keys):
+        counts = np.add.reduceat(weights[order], group_starts)
+    else:
+        counts = np.zeros(0, dtype=np.int64)
+
+    # Unpack the characters of the n-grams
+    mask = (1 << bits) - 1
+    ngram_chars = np.empty((len(ngram_keys), n), dtype=np.uint32)
+    for idx in range(n):
+        shift = bits * (n - 1 - idx)
+        ngram_chars[:, idx] = alphabet[(ngram_keys >> shift) & mask]
+
+    text = ngram_chars.tobytes().decode("utf-32-le")
+    ngrams = [text[idx:idx+n] for idx in range(0, len(text), n)]
+
+    return Vocabulary.from_arrays(ngrams, counts)
@@ -5,15 +5,107 @@ Order the given frequencies.
 """
 
 import pandas as pd
-import math
+import numpy as np
 
-from spell_checker import caseless_check 
+from spell_checker import check_word
 from collect_ipa import collect_ipa
+from vocabulary import Vocabulary
+
+
+
+def freq_to_arrays(freq_dict):
+    """
+    Converts frequency information into two parallel arrays.
+
+    Parameters
+    ----------
+    freq_dict : Vocabulary or dict
+        The vocabulary or dictionary containing unit to its frequency.
+
+    Returns
+    -------
+    units : numpy array of objects
+        The units (words/characters/bigrams).
+    freqs : numpy array of int64
+        The frequency of every unit.
+
+    """
+    if isinstance(freq_dict, Vocabulary):
+        return freq_dict.to_arrays()
+
+    units = np.empty(len(freq_dict), dtype=object)
+    units[:] = list(freq_dict.keys())
+    freqs = np.fromiter(freq_dict.values(), dtype=np.int64,
+                        count=len(freq_dict))
+
+    return units, freqs
+
+
+
+def filter_units(units, ipa_dict=None, spell_check="", spell_cache=None):
+    """
+    Finds the units that have IPA information and/or are spelled correctly.
+
+    Parameters
+    ----------
+    units : numpy array of objects
+        The units (words) to check.
+    ipa_dict : dict, optional
+        A dictionary that provides an IPA transcription for available words
+            (see collect_ipa). The default is None (= no IPA filter).
+    spell_check : string, optional
+        Provide the language abbreviation of the necessary Aspell dictionary
+            to filter the words using Aspell spell checker.
+        The default is "" (= no spell check).
+    spell_cache : SpellCheckCache, optional
+        The results of the spell check that was run in advance.
+        The default is None (= check every word with Aspell now).
+
+    Returns
+    -------
+    keep : numpy array of bool
+        True for every unit that passes the filters.
+    ipa_info : numpy array of objects
+        The IPA transcription of every unit (None without the IPA filter).
+
+    """
+    # Keep track of the units that pass the filters
+    keep = np.ones(len(units), dtype=bool)
+    ipa_info = np.full(len(units), None, dtype=object)
+
+    # Check for IPA if applicable
+    if ipa_dict is not None:
+        ipa_info = pd.Series(units, dtype=object).map(ipa_dict)
+
+        # Rewrite ß as ss to search for IPA
+        # to account for German spelling versions
+        ss_units = (ipa_info.isna() & pd.Series(units, dtype=object).str.contains("ß")).to_numpy()
+        if ss_units.any():
+            ss_words = pd.Series(units[ss_units], dtype=object).str.replace("ß", "ss")
+            ipa_info[ss_units] = ss_words.map(ipa_dict).to_numpy()
+
+        # If the ipa info isn't available, exclude the word
+        keep &= ipa_info.notna().to_numpy()
+        ipa_info = ipa_info.to_numpy()
+
+    if spell_check:
+        # Spell check and remove any misspellings
+        # Only check the units that passed the other filters
+        for idx in np.flatnonzero(keep):
+            if spell_cache is not None:
+                spelled_correct = spell_cache.check(units[idx])
+            else:
+                spelled_correct = check_word(units[idx], lang=spell_check)
+            if not spelled_correct:
+                keep[idx] = False
+
+    return keep, ipa_info
 
 
 
 def order_data(freq_dict, unit_name="Word", ipa_dir="", lang=None,
-               spell_check="", stats=False):
+               spell_check="", top=0, min_freq=0, ipa_dict=None,
+               spell_cache=None, corpus="full", stats=False):
     """
     Organises data into a data frame into columns:
     Rank, Word/Character/Bigram, Frequency, Frequency per million, IPA (optional)
@@ -24,23 +116,45 @@ def order_data(freq_dict, unit_name="Word", ipa_dir="", lang=None,
 
     Parameters
     ----------
-    freq_dict : dict
-        A dictionary containing word/character/bigram frequency information.
+    freq_dict : Vocabulary or dict
+        The vocabulary or dictionary containing word/character/bigram
+            frequency information.
     unit_name : str, optional
-        The name of the unit used for frequency counting. 
+        The name of the unit used for frequency counting.
         Options: "Word", "Character", "Bigram". The default is "Word".
     ipa_dir : str, optional
-        Provide path to the directory with the IPA information 
+        Provide path to the directory with the IPA information
             if the information is to be added. The default is "" (= no IPA).
     lang : str, optional
-        The abbreviation of the language as given in the name of 
+        The abbreviation of the language as given in the name of
             the data file (only necessary for IPA). The default is None.
     spell_check : string, optional
-        Provide the language abbreviation of the necessary Aspell dictionary 
+        Provide the language abbreviation of the necessary Aspell dictionary
             to filter the words using Aspell spell checker.
         You can find the spell checker at aspell.net.
+    top : int, optional
+        Only keep the given number of the most frequent units (after the
+            IPA and spell check filters). Only the units that can make it
+            into the top are sorted, checked for IPA and spell checked.
+        The default is 0 (= all units).
+    min_freq : int, optional
+        Only keep the units with at least the given frequency.
+        The default is 0 (= all units).
+        With top or min_freq, the frequency per million and the Zipf value
+            are calculated against the total of all units in the data
+            (also for the spell checked version).
+    ipa_dict : dict, optional
+        The IPA information that was already collected from ipa_dir
+            (see collect_ipa). The default is None (= collect it now).
+    spell_cache : SpellCheckCache, optional
+        The results of the spell check that was run in advance.
+        The default is None (= check every word with Aspell now).
+    corpus : str, optional
+        The name of the corpus the frequencies were counted from, used in
+            the statistics, e.g. "IPA" for the phoneme frequencies
+            (with ipa_dir, the corpus is always "IPA"). The default is "full".
     stats : bool, optional
-        Set to True to have some statistical information about the corpus 
+        Set to True to have some statistical information about the corpus
             printed out. The default is False.
 
     Returns
@@ -49,132 +163,117 @@ def order_data(freq_dict, unit_name="Word", ipa_dir="", lang=None,
         Dataframe containing ordered information about the data.
 
     """
-    # The columns to be added to the data frame
-    data_dict = {"Rank": [], unit_name: [], "Frequency": [], 
-                 "Frequency per million": [], "Zipf value": []}
-    
-    if ipa_dir:
-        # Add the IPA column
-        data_dict["IPA"] = []
-        # Extract the IPA information
-        ipa_dict = collect_ipa(lang, ipa_dir)
-    
-    # Sort the data from highest frequency to lowest, alphabetically
-    ordered_data = sorted(freq_dict.items(), key=lambda x: (-x[1], x[0]))
-    
+    units, freqs = freq_to_arrays(freq_dict)
+    # The number of types before any of them are dropped
+    all_types = len(units)
+
+    # The spell check only applies to words
+    if unit_name != "Word":
+        spell_check = ""
+
     # To take into account all of the units without filter
-    if not spell_check or unit_name != "Word":
+    if not spell_check or top or min_freq:
         # Get the total number of units in the data
-        total_units = sum(freq_dict.values())
-        
-    rank = 0
-    prev_freq = 0
-    
-    
-    if stats:
-        total_types = 0
-        
-        # Initialize counters for word statistics
-        if unit_name == "Word":
-            word_len = 0
-            type_len = 0
-            
-            if ipa_dir:
-                ipa_units = 0
-    
+        total_units = int(freqs.sum())
+
+    # Drop the units that are too rare before sorting
+    if min_freq:
+        frequent = freqs >= min_freq
+        units = units[frequent]
+        freqs = freqs[frequent]
+
+    # Extract the IPA information if it hasn't been extracted yet
+    if not ipa_dir:
+        ipa_dict = None
+    elif ipa_dict is None:
+        ipa_dict = collect_ipa(lang, ipa_dir)
+
+    # Sort and filter only the units that can make it into the top.
+    # If too many of them are filtered out, take twice as many units.
+    n_units = min(top, len(units)) if top else len(units)
+    n_checked = 0
+    keep = np.zeros(0, dtype=bool)
+    ipa_info = np.zeros(0, dtype=object)
+
+    while True:
+        if n_units < len(units):
+            # Select the n most frequent units (and the ones as frequent
+            # as the last of them) without sorting all of the units
+            kth = len(units) - n_units
+            min_top_freq = np.partition(freqs, kth)[kth]
+            selected = np.flatnonzero(freqs >= min_top_freq)
+        else:
+            selected = np.arange(len(units))
+
+        # Sort the data from highest frequency to lowest, alphabetically
+        # (the units that were already checked stay in front)
+        order = selected[np.lexsort((units[selected], -freqs[selected]))]
+
+        # Only check the units that haven't been checked yet
+        new_keep, new_ipa_info = filter_units(units[order[n_checked:]],
+                                              ipa_dict=ipa_dict,
+                                              spell_check=spell_check,
+                                              spell_cache=spell_cache)
+        keep = np.concatenate([keep, new_keep])
+        ipa_info = np.concatenate([ipa_info, new_ipa_info])
+        n_checked = len(order)
+
+        if not top or keep.sum() >= top or n_checked == len(units):
+            break
+        n_units = min(2*n_units, len(units))
+
+    units = units[order][keep][:top or None]
+    freqs = freqs[order][keep][:top or None]
+    ipa_info = ipa_info[keep][:top or None]
+
+    # Determine the true rank
+    # (units with the same frequency are assigned the same rank)
+    new_freq = np.ones(len(freqs), dtype=bool)
+    new_freq[1:] = freqs[1:] != freqs[:-1]
+    ranks = np.cumsum(new_freq)
+
+    # For the spell checked version, calculate frequency per million and
+    # Zipf value after adjusting the total
+    if spell_check and not top and not min_freq:
+        total_units = int(freqs.sum())
+
+    # Calculate frequency per million
+    freq_mil = np.round(10**6 * freqs / total_units, 4)
+    # Calculate Zipf value
+    zipf_val = np.round(np.log10(freq_mil) + 3, 4)
+
     # Collect all data into one table
-    for (unit, freq) in ordered_data:
-        
-        if spell_check and unit_name == "Word":
-            # Spell check and remove any misspellings
-            spelled_correct = caseless_check(unit, lang=spell_check)
-            # Some words are only recognised without the apostrophe in front, e.g. 'cause
-            if not spelled_correct and unit.startswith("'"):
-                spelled_correct = caseless_check(unit[1:], lang=spell_check)
-            if not spelled_correct:
-                continue
-        
-        # Check for IPA if applicable
-        if ipa_dir:
-            ipa_info = None
-            
-            if unit in ipa_dict:
-                ipa_info = ipa_dict[unit]
-            elif "ß" in unit:
-                # Rewrite ß as ss to search for IPA
-                # to account for German spelling versions
-                ssword = unit.replace("ß", "ss")
-                if ssword in ipa_dict:
-                    ipa_info = ipa_dict[ssword]
-            
-            # If the ipa info is available, include the word
-            if ipa_info:
-                data_dict["IPA"].append(ipa_info)
-            # If the ipa info isn't available, exclude the word
-            else:
-                continue
-        
-        # Determine the true rank
-        if freq != prev_freq:
-            # If the frequency of the current word is different from the
-            # previous, increase its rank
-            rank += 1
-            prev_freq = freq
-        
-        # Add all of the information about the unit to the data frame
-        data_dict["Rank"].append(rank)
-        data_dict[unit_name].append(unit)
-        data_dict["Frequency"].append(freq)
-        
-        # For the spell checked version, calculate frequency per million and 
-        # Zipf value after adjusting the total
-        if not spell_check or unit_name != "Word":
-            # Calculate frequency per million
-            freq_mil = round(10**6 * freq / total_units, 4)
-            data_dict["Frequency per million"].append(freq_mil)
-            
-            # Calculate Zipf value
-            zipf_val = round(math.log10(freq_mil)+3, 4)
-            data_dict["Zipf value"].append(zipf_val)
-        
-        # Calculate word information for statistics
-        if stats:
-            total_types += 1
-            if unit_name == "Word":
-                curr_len = len(unit)
-                word_len += curr_len*freq
-                type_len += curr_len
-                if ipa_dir:
-                    ipa_units += freq
-    
-    
-    # Claculate frequency per million and Zipf value for the spell checked version
-    if spell_check and unit_name == "Word":
-        total_units = sum(data_dict["Frequency"])
-        for freq in data_dict["Frequency"]:
-            # Calculate frequency per million
-            freq_mil = round(10**6 * freq / total_units, 4)
-            data_dict["Frequency per million"].append(freq_mil)
-            
-            # Calculate Zipf value
-            zipf_val = round(math.log10(freq_mil)+3, 4)
-            data_dict["Zipf value"].append(zipf_val)
-    
+    data_dict = {"Rank": ranks, unit_name: units, "Frequency": freqs,
+                 "Frequency per million": freq_mil, "Zipf value": zipf_val}
+
+    if ipa_dir:
+        # Add the IPA column
+        data_dict["IPA"] = ipa_info
+
     freq_df = pd.DataFrame(data_dict)
 
     # Print out the statistics
     if stats:
-        corpus_size = "IPA" if ipa_dir else "full"
+        total_types = len(units)
+        corpus_size = "IPA" if ipa_dir else corpus
         if ipa_dir:
-            total_units = ipa_units
+            total_units = int(freqs.sum())
         if unit_name == "Word":
-            word_len_av = round(word_len/total_units, 2)
-            type_len_av = round(type_len/total_types, 2)
+            unit_lens = np.fromiter(map(len, units), dtype=np.int64,
+                                    count=len(units))
+            word_len_av = round(int((unit_lens*freqs).sum())/int(freqs.sum()), 2)
+            type_len_av = round(int(unit_lens.sum())/total_types, 2)
             print(f"The average word length within the {corpus_size} corpus text is {word_len_av}.")
             print(f"The average unique word length within the {corpus_size} corpus {type_len_av}.")
             print()
         print(f"The total number of {unit_name.lower()}s in the {corpus_size} corpus is {total_units}.")
-        print(f"The total number of {unit_name.lower()} types in the {corpus_size} corpus is {total_types}.")
+        if top or min_freq:
+            # Only the types of the whole corpus are known before the filters
+            if not ipa_dir:
+                print(f"The total number of {unit_name.lower()} types in the {corpus_size} corpus is {all_types}.")
+            print(f"The number of exported {unit_name.lower()} types is {total_types}.")
+        else:
+            print(f"The total number of {unit_name.lower()} types in the {corpus_size} corpus is {total_types}.")
         print()
-    
+
     return freq_df
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# Authors: Elizaveta Sineva, Sara Chilson
+"""
+Counting phoneme frequencies from the IPA transcriptions.
+
+The phonemes are counted once per word type and weighted by the frequency
+of the word. The transcriptions from WikiPron are already segmented into
+phonemes separated by spaces.
+"""
+
+import unicodedata
+
+import pandas as pd
+
+
+# The separator of the different transcriptions of the same word
+VARIANT_SEP = "  |  "
+
+# The unicode categories of the diacritics and modifiers (e.g. ̃ , ʰ, ː)
+# that belong to the preceding phoneme
+DIACRITIC_CATEGORIES = ("Mn", "Mc", "Lm", "Sk")
+
+
+
+def segment_ipa(ipa):
+    """
+    Splits an IPA transcription into phonemes.
+    Only the first transcription is used if the word has several.
+    Diacritics that are separated from their phoneme by a space
+    are attached to the preceding phoneme.
+
+    Parameters
+    ----------
+    ipa : str
+        The IPA transcription(s) of a word, separated by VARIANT_SEP.
+
+    Returns
+    -------
+    phonemes : list of strings
+        The phonemes of the word.
+
+    """
+    transcription = ipa.split(VARIANT_SEP)[0]
+
+    phonemes = []
+
+    for segment in transcription.split():
+        # Attach the separated diacritics to the previous phoneme
+        if phonemes and all(unicodedata.category(char) in DIACRITIC_CATEGORIES
+                            for char in segment):
+            phonemes[-1] += segment
+        else:
+            phonemes.append(segment)
+
+    return phonemes
+
+
+
+def count_phonemes(ipa_df):
+    """
+    Counts the frequency of every phoneme, phoneme bigram and word length
+    (in phonemes) in the IPA data, weighted by the frequency of the words.
+    The phoneme bigrams are counted within the word, with the start and
+    the end of the word marked by ^ and $ (e.g. "^ k", "k æ", "æ t", "t $").
+
+    Parameters
+    ----------
+    ipa_df : pandas DataFrame
+        Dataframe containing the columns Frequency and IPA
+            (see order_data).
+
+    Returns
+    -------
+    phoneme_freq : dictionary
+        Dictionary containing phoneme to its frequency.
+    phoneme_bigram_freq : dictionary
+        Dictionary containing phoneme bigram to its frequency.
+    length_freq : dictionary
+        Dictionary containing word length in phonemes to its frequency.
+
+    """
+    freqs = ipa_df["Frequency"].reset_index(drop=True)
+    segments = ipa_df["IPA"].reset_index(drop=True).map(segment_ipa)
+
+    # The phoneme bigrams of every word, including the start and the end
+    bigrams = segments.map(lambda phonemes: [f"{first} {second}" for first, second
+                                             in zip(["^"] + phonemes, phonemes + ["$"])])
+
+    # Repeat the frequency of the word for each of its phonemes / bigrams
+    # and sum up the frequencies of the same units
+    phoneme_freq = (pd.DataFrame({"Unit": segments, "Frequency": freqs})
+                    .explode("Unit").dropna()
+                    .groupby("Unit")["Frequency"].sum())
+    phoneme_bigram_freq = (pd.DataFrame({"Unit": bigrams, "Frequency": freqs})
+                           .explode("Unit").dropna()
+                           .groupby("Unit")["Frequency"].sum())
+    length_freq = freqs.groupby(segments.str.len()).sum()
+
+    return phoneme_freq.to_dict(), phoneme_bigram_freq.to_dict(), length_freq.to_dict()
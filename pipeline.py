@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# Authors: Elizaveta Sineva, Sara Chilson
+"""
+Run the decompression and the counting of the data at the same time.
+
+The gz file is decompressed in a background thread (zlib releases the GIL)
+and the lines are handed over in batches through a bounded queue to the
+counting in the main thread. If the counting falls behind, the queue fills
+up and the decompression waits, so only a few batches are kept in memory
+instead of the whole data.
+"""
+
+import queue
+import threading
+import time
+
+from extract_data import iter_data
+from count_freq import count_freq
+
+
+# The number of lines handed over at once
+BATCH_SIZE = 10000
+
+# The maximum number of batches waiting to be counted
+QUEUE_SIZE = 16
+
+
+
+def decompress_stage(gz_file, line_queue, timings, batch_size=BATCH_SIZE):
+    """
+    Reads the lines of a gz file and puts them into the queue in batches.
+    Puts None into the queue once the data has been read.
+
+    Parameters
+    ----------
+    gz_file : string
+        The path to the data file of gz type.
+    line_queue : queue.Queue
+        The queue to put the batches of lines into.
+    timings : dict
+        The dictionary to store the time spent working and waiting in.
+    batch_size : int, optional
+        The number of lines in a batch. The default is BATCH_SIZE.
+
+    Returns
+    -------
+    None.
+
+    """
+    time_start = time.perf_counter()
+    time_wait = 0
+
+    try:
+        batch = []
+        for line in iter_data(gz_file):
+            batch.append(line)
+
+            if len(batch) >= batch_size:
+                # Wait here if the counting falls behind
+                time_put = time.perf_counter()
+                line_queue.put(batch)
+                time_wait += time.perf_counter() - time_put
+                batch = []
+
+        if batch:
+            line_queue.put(batch)
+
+    # Pass the error on to the counting stage
+    except Exception as error:
+        timings["error"] = error
+
+    finally:
+        time_total = time.perf_counter() - time_start
+        timings["decompress"] = (time_total - time_wait, time_wait)
+        line_queue.put(None)
+
+
+
+def stream_lines(line_queue, timings):
+    """
+    Yields the lines from the batches in the queue until None is received.
+
+    Parameters
+    ----------
+    line_queue : queue.Queue
+        The queue to get the batches of lines from.
+    timings : dict
+        The dictionary to store the time spent waiting for the data in.
+
+    Yields
+    ------
+    line : string
+        A line from the data.
+
+    """
+    time_wait = 0
+
+    while True:
+        time_get = time.perf_counter()
+        batch = line_queue.get()
+        time_wait += time.perf_counter() - time_get
+
+        if batch is None:
+            break
+
+        yield from batch
+
+    timings["count_wait"] = time_wait
+
+
+
+def pipeline_freq(gz_file, count_character=False, count_bigram=False,
+                  dedup=False, cache_size=0, on_new_word=None, stats=False):
+    """
+    Counts the frequencies in a gz file while it is being decompressed.
+    Prints out how busy each of the stages was, to show the bottleneck.
+
+    Parameters
+    ----------
+    gz_file : string
+        The path to the data file of gz type.
+    count_character : bool, optional
+        Set to True if the information about word character frequency is to
+            be added. The default is False.
+    count_bigram : bool, optional
+        Set to True if the information about bigram frequency within a word
+            is to be added. The default is False.
+    dedup : bool, optional
+        Set to True to count every distinct line only once (see count_freq).
+        The default is False.
+    cache_size : int, optional
+        The size of the cache of processed lines (see count_freq).
+        The default is 0 (= no cache).
+    on_new_word : function, optional
+        The function to call with every new word (see count_freq).
+        The default is None.
+    stats : bool, optional
+        Set to True to have some statistical information about the corpus
+            printed out. The default is False.
+
+    Raises
+    ------
+    Exception
+        If the data could not be read from the gz file.
+
+    Returns
+    -------
+    word_freq : Vocabulary
+        Vocabulary containing every word and its frequency.
+    character_freq : dictionary
+        Dictionary containing word character to its frequency
+            if count_character is True.
+    bigram_freq : dictionary
+        Dictionary containing bigram to its frequency if count_bigram is True.
+
+    """
+    line_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    timings = {}
+
+    time_start = time.perf_counter()
+
+    decompress_thread = threading.Thread(target=decompress_stage,
+                                         args=(gz_file, line_queue, timings),
+                                         daemon=True)
+    decompress_thread.start()
+
+    freqs = count_freq(stream_lines(line_queue, timings),
+                       count_character=count_character,
+                       count_bigram=count_bigram, dedup=dedup,
+                       cache_size=cache_size, on_new_word=on_new_word,
+                       stats=stats)
+
+    decompress_thread.join()
+    time_total = time.perf_counter() - time_start
+
+    if "error" in timings:
+        raise timings["error"]
+
+    # Report the utilisation of every stage
+    decompress_busy, decompress_wait = timings["decompress"]
+    count_wait = timings["count_wait"]
+    count_busy = time_total - count_wait
+
+    print(f"Decompression: busy {round(decompress_busy, 1)} s ({round(100*decompress_busy/time_total, 1)}%), "
+          f"waiting for the counting {round(decompress_wait, 1)} s.")
+    print(f"Counting: busy {round(count_busy, 1)} s ({round(100*count_busy/time_total, 1)}%), "
+          f"waiting for the decompression {round(count_wait, 1)} s.")
+    print()
+
+    return freqs
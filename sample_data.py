@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# Authors: Elizaveta Sineva, Sara Chilson
+"""
+Progressive sampling of the data.
+
+The lines are counted in evenly spread slices (every n-th line), so that
+after every slice the counts cover an even sample of the whole corpus.
+After each slice (checkpoint) the top words are compared with the previous
+checkpoint to see how stable the ranks and Zipf values already are.
+"""
+
+import numpy as np
+import pandas as pd
+
+from count_freq import count_freq
+from order_data import order_data
+from export_data import export_data
+from vocabulary import Vocabulary
+
+
+
+def top_words(word_freq, top_n):
+    """
+    Extracts the most frequent words and their Zipf values.
+
+    Parameters
+    ----------
+    word_freq : Vocabulary
+        Vocabulary containing every word and its frequency.
+    top_n : int
+        The number of the most frequent words to extract.
+
+    Returns
+    -------
+    zipf : pandas Series
+        The Zipf values of the top words (indexed by word),
+            from the most frequent word to the least frequent.
+
+    """
+    units, freqs = word_freq.to_arrays()
+
+    # Sort the data from highest frequency to lowest, alphabetically
+    order = np.lexsort((units, -freqs))[:top_n]
+    zipf = np.log10(10**6 * freqs[order] / freqs.sum()) + 3
+
+    return pd.Series(zipf, index=units[order])
+
+
+
+def compare_checkpoints(prev_zipf, curr_zipf):
+    """
+    Compares the top words of two successive checkpoints.
+
+    Parameters
+    ----------
+    prev_zipf : pandas Series
+        The Zipf values of the top words at the previous checkpoint.
+    curr_zipf : pandas Series
+        The Zipf values of the top words at the current checkpoint.
+
+    Returns
+    -------
+    rank_corr : float
+        Spearman rank correlation of the words that are in the top
+            at either of the checkpoints.
+    zipf_diff : float
+        The mean absolute change of the Zipf values of these words.
+
+    """
+    # The words that dropped out of the top are ranked at the bottom
+    both = pd.concat([prev_zipf, curr_zipf], axis=1, join="outer")
+    both = both.fillna(min(prev_zipf.min(), curr_zipf.min()))
+
+    # Spearman rank correlation (Pearson correlation of the ranks)
+    rank_corr = both[0].rank().corr(both[1].rank())
+    zipf_diff = (both[0] - both[1]).abs().mean()
+
+    return rank_corr, zipf_diff
+
+
+
+def sample_freq(data_lines, n_checkpoints=10, top_n=1000, threshold=0.999,
+                checkpoint_file="", file_types="txt", count_character=False,
+                count_bigram=False, cache_size=0, on_new_word=None, stats=False):
+    """
+    Counts the frequencies progressively on evenly spread samples of the data
+    and reports how stable the most frequent words are between checkpoints.
+    Stops early once the ranks of the top words have converged.
+
+    Parameters
+    ----------
+    data_lines : list of strings
+        A list of lines (sentences) from the data file.
+    n_checkpoints : int, optional
+        The number of slices the data is split into. After every slice
+            the counts are compared with the previous ones.
+        The default is 10.
+    top_n : int, optional
+        The number of the most frequent words to compare between
+            the checkpoints. The default is 1000.
+    threshold : float, optional
+        Stop once the rank correlation between two successive checkpoints
+            reaches the threshold. Set to a value above 1 to always process
+            all the data. The default is 0.999.
+    checkpoint_file : str, optional
+        The name of the file / path to the file to which the preliminary
+            word frequencies are exported at every checkpoint.
+        The default is "" (= no preliminary export).
+    file_types : str, optional
+        The extension of the preliminary files (see export_data).
+        The default is "txt".
+    count_character : bool, optional
+        Set to True if the information about word character frequency is to
+            be added. The default is False.
+    count_bigram : bool, optional
+        Set to True if the information about bigram frequency within a word
+            is to be added. The default is False.
+    cache_size : int, optional
+        The size of the cache of processed lines (see count_freq).
+        The default is 0 (= no cache).
+    on_new_word : function, optional
+        The function to call with every new word (see count_freq).
+        Every word is only passed once, when the slice it first appears
+            in has been counted. The default is None.
+    stats : bool, optional
+        Set to True to have some statistical information about every slice
+            printed out (see count_freq). The default is False.
+
+    Returns
+    -------
+    word_freq : Vocabulary
+        Vocabulary containing every word and its frequency in the sample.
+    character_freq : Vocabulary
+        Vocabulary containing word character to its frequency in the sample
+            if count_character is True.
+    bigram_freq : Vocabulary
+        Vocabulary containing bigram to its frequency in the sample
+            if count_bigram is True.
+
+    """
+    word_freq = Vocabulary(on_new_unit=on_new_word)
+    character_freq = Vocabulary()
+    bigram_freq = Vocabulary()
+
+    prev_zipf = None
+
+    for checkpoint in range(n_checkpoints):
+        # Every n-th line, so that each slice is spread over the whole data
+        data_slice = data_lines[checkpoint::n_checkpoints]
+
+        slice_freqs = count_freq(data_slice, count_character=count_character,
+                                 count_bigram=count_bigram,
+                                 cache_size=cache_size, stats=stats)
+
+        word_freq.merge(slice_freqs[0])
+        character_freq.merge(slice_freqs[1])
+        bigram_freq.merge(slice_freqs[2])
+
+        # Export the preliminary word frequencies
+        if checkpoint_file:
+            export_data(order_data(word_freq), checkpoint_file,
+                        file_types=file_types)
+
+        curr_zipf = top_words(word_freq, top_n)
+        share = round(100 * (checkpoint+1) / n_checkpoints, 1)
+
+        if prev_zipf is None:
+            print(f"Checkpoint 1/{n_checkpoints} ({share}% of the lines): {len(word_freq)} word types.")
+            prev_zipf = curr_zipf
+            continue
+
+        rank_corr, zipf_diff = compare_checkpoints(prev_zipf, curr_zipf)
+        prev_zipf = curr_zipf
+
+        print(f"Checkpoint {checkpoint+1}/{n_checkpoints} ({share}% of the lines): {len(word_freq)} word types, "
+              f"rank correlation of the top {top_n} words {round(rank_corr, 4)}, "
+              f"mean Zipf value change {round(zipf_diff, 4)}.")
+
+        # Stop once the top ranks do not change anymore
+        if rank_corr >= threshold and checkpoint+1 < n_checkpoints:
+            print(f"The ranks have converged (threshold {threshold}), stopping after {share}% of the lines.")
+            break
+
+    print()
+
+    return word_freq, character_freq, bigram_freq
@@ -6,7 +6,9 @@ You can find the Aspell spell checker at aspell.net.
 Version of Aspell used: 
     International Ispell Version 3.1.20 (but really Aspell 0.60.8.1)
 """
+import queue
 import subprocess
+import threading
 
 
 def check_aspell(word, lang="en"):
@@ -44,7 +46,7 @@ def check_aspell(word, lang="en"):
     return word_exists
     
 
-def caseless_check(word, lang="en"):
+def caseless_check(word, lang="en", check=None):
     """
     Performs a word check in Aspell using the check_aspell functions, but
     ignores the case of the word (e.g. america will be accepted as a word
@@ -57,6 +59,9 @@ def caseless_check(word, lang="en"):
     lang : string, optional
         The abbreviation of the necessary language to be used in Aspell.
             The default is "en".
+    check : function, optional
+        The function that checks a word with the case (e.g. AspellPipe.check).
+        The default is None (= check_aspell for the language lang).
 
     Returns
     -------
@@ -65,16 +70,223 @@ def caseless_check(word, lang="en"):
             the case) in the Aspell dictionary for the given language lang.
 
     """
+    if check is None:
+        check = lambda case_word: check_aspell(case_word, lang=lang)
+    
     # Check if lower-cased word exists
-    word_exist = check_aspell(word.lower(), lang=lang)
+    word_exist = check(word.lower())
     
     if not word_exist:
         # Check if capitalized word exists
-        word_exist = check_aspell(word.capitalize(), lang=lang)
+        word_exist = check(word.capitalize())
         
         if not word_exist:
             # Check if upper-cased word exists
-            word_exist = check_aspell(word.upper(), lang=lang)
+            word_exist = check(word.upper())
     
     return word_exist
 
+
+def check_word(word, lang="en", check=None):
+    """
+    Checks if a word from the data is spelled correctly (see caseless_check).
+    Some words are only recognised without the apostrophe in front, 
+    e.g. 'cause, so these are checked again without it.
+
+    Parameters
+    ----------
+    word : string
+        The word to be checked by Aspell.
+    lang : string, optional
+        The abbreviation of the necessary language to be used in Aspell.
+            The default is "en".
+    check : function, optional
+        The function that checks a word with the case (e.g. AspellPipe.check).
+        The default is None (= check_aspell for the language lang).
+
+    Returns
+    -------
+    spelled_correct : bool
+        Returns True if the word is spelled correctly.
+
+    """
+    spelled_correct = caseless_check(word, lang=lang, check=check)
+    
+    if not spelled_correct and word.startswith("'"):
+        spelled_correct = caseless_check(word[1:], lang=lang, check=check)
+    
+    return spelled_correct
+
+
+class AspellPipe:
+    """
+    Checks words with one Aspell process that keeps running, instead of 
+    starting a new process for every word (as check_aspell does).
+
+    Parameters
+    ----------
+    lang : string, optional
+        The abbreviation of the necessary language to be used in Aspell.
+            The default is "en".
+
+    """
+    
+    def __init__(self, lang="en"):
+        self.process = subprocess.Popen(["aspell", "-l", lang, "-a"],
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        encoding="utf-8", bufsize=1)
+        # Skip the version line
+        self.process.stdout.readline()
+    
+    def check(self, word):
+        """
+        Checks if a word is spelled correctly (see check_aspell).
+
+        Parameters
+        ----------
+        word : string
+            The word to be checked by Aspell.
+
+        Returns
+        -------
+        word_exist : bool
+            Returns True if the word exists in the Aspell dictionary. 
+                Case-sensitive.
+
+        """
+        # The ^ makes Aspell check the line even if it starts 
+        # with a special character
+        self.process.stdin.write(f"^{word}\n")
+        self.process.stdin.flush()
+        
+        # As in check_aspell, only the result for the first part 
+        # of the word counts (e.g. for words with a hyphen)
+        result = self.process.stdout.readline()
+        word_exists = result.startswith("*")
+        
+        # The results for the line end with an empty line
+        while result.strip():
+            result = self.process.stdout.readline()
+        
+        return word_exists
+    
+    def close(self):
+        """
+        Stops the Aspell process.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class SpellCheckCache:
+    """
+    Spell checks words in a background thread and keeps the results.
+    The words can be submitted as soon as they appear in the data, so that
+    the spell check runs at the same time as the counting.
+
+    Parameters
+    ----------
+    lang : string, optional
+        The abbreviation of the necessary language to be used in Aspell.
+            The default is "en".
+
+    """
+    
+    def __init__(self, lang="en"):
+        self.verdicts = {}
+        self.words = queue.Queue()
+        self.lock = threading.Lock()
+        self.aspell = AspellPipe(lang)
+        
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def _run(self):
+        # Check the submitted words until None is received
+        while True:
+            word = self.words.get()
+            if word is None:
+                break
+            self.check(word)
+    
+    def submit(self, word):
+        """
+        Adds a word to be checked in the background.
+
+        Parameters
+        ----------
+        word : string
+            The word to be checked by Aspell.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.words.put(word)
+    
+    def check(self, word):
+        """
+        Checks if a word from the data is spelled correctly (see check_word).
+        Only checks the word with Aspell if it hasn't been checked yet.
+
+        Parameters
+        ----------
+        word : string
+            The word to be checked by Aspell.
+
+        Returns
+        -------
+        spelled_correct : bool
+            Returns True if the word is spelled correctly.
+
+        """
+        with self.lock:
+            if word not in self.verdicts:
+                self.verdicts[word] = check_word(word, check=self.aspell.check)
+            return self.verdicts[word]
+    
+    def stop(self):
+        """
+        Stops the background spell check, e.g. before the words are filtered,
+        so that the on-demand checks don't have to wait for it.
+        The words that haven't been checked yet are skipped (they are
+            checked by check when they are needed).
+        Aspell keeps running for the on-demand checks.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.thread.is_alive():
+            return
+        
+        # Skip the words that are still waiting to be checked
+        while True:
+            try:
+                self.words.get_nowait()
+            except queue.Empty:
+                break
+        
+        self.words.put(None)
+        self.thread.join()
+    
+    def close(self):
+        """
+        Stops the background spell check and the Aspell process.
+        The words that haven't been checked yet are skipped.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.stop()
+        self.aspell.close()
@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+# Authors: Elizaveta Sineva, Sara Chilson
+"""
+A compact vocabulary for counting frequencies.
+
+Every distinct unit (word, character, bigram) is stored once as UTF-8 in
+a single byte buffer (the string pool) and is identified by an integer ID.
+The units are looked up by their 64-bit hash in sorted NumPy arrays and
+every match is checked against the string pool. The frequencies are kept
+in an int64 NumPy buffer indexed by the ID, so no Python objects are kept
+per unit (except for the rare units whose hashes collide).
+"""
+
+from collections import Counter
+
+import numpy as np
+
+
+# The separator of the units in the string pool
+UNIT_SEP = "\n"
+
+# The number of new hashes collected before they are merged
+# into the main sorted index
+RECENT_SIZE = 65536
+
+
+class Vocabulary:
+    """
+    A string pool with a hash index and array-backed int64 counts.
+
+    The occurrences are first collected in a small buffer and are looked up
+    and added to the counts in bulk (see flush). A unit found by its hash
+    is compared with the unit stored in the pool, and a new unit whose hash
+    is already taken by another unit is kept in a dictionary instead of the
+    hash index, so two different units are never counted together.
+
+    Parameters
+    ----------
+    flush_size : int, optional
+        The number of buffered occurrences after which they are added
+            to the counts. The default is 16,384.
+    on_new_unit : function, optional
+        The function to call with every new unit when it is first added
+            (e.g. to spell check it in the background). The default is None.
+
+    """
+
+    def __init__(self, flush_size=16384, on_new_unit=None):
+        self.flush_size = flush_size
+        self.on_new_unit = on_new_unit
+
+        # The units separated by UNIT_SEP, in the order of their IDs,
+        # and the position of every unit in the pool (the last offset
+        # is the end of the pool)
+        self.pool = bytearray()
+        self.offsets = np.zeros(1025, dtype=np.int64)
+        self.counts = np.zeros(1024, dtype=np.int64)
+        self.n_units = 0
+
+        # The sorted hashes and the IDs of their units. The new hashes
+        # are kept apart until there are enough of them to merge.
+        self._hashes = np.zeros(0, dtype=np.int64)
+        self._hash_ids = np.zeros(0, dtype=np.int32)
+        self._recent_hashes = np.zeros(0, dtype=np.int64)
+        self._recent_ids = np.zeros(0, dtype=np.int32)
+
+        # The units whose hash was already taken by another unit
+        self._collisions = {}
+
+        self._pending = []
+
+    def __len__(self):
+        self.flush()
+        return self.n_units
+
+    def __contains__(self, unit):
+        self.flush()
+        return self._find([unit])[0][0] >= 0
+
+    def _lookup(self, hashes):
+        """
+        Finds the IDs of the units with the given (distinct) hashes.
+
+        Parameters
+        ----------
+        hashes : numpy array of int64
+            The hashes of the units.
+
+        Returns
+        -------
+        ids : numpy array of int64
+            The ID of every unit, -1 for the units that aren't known yet.
+
+        """
+        ids = np.full(len(hashes), -1, dtype=np.int64)
+
+        # Searching for the hashes in order is much faster
+        order = np.argsort(hashes)
+        sorted_hashes = hashes[order]
+
+        for index_hashes, index_ids in ((self._hashes, self._hash_ids),
+                                        (self._recent_hashes, self._recent_ids)):
+            if not len(index_hashes):
+                continue
+            pos = np.minimum(np.searchsorted(index_hashes, sorted_hashes),
+                             len(index_hashes) - 1)
+            found = index_hashes[pos] == sorted_hashes
+            ids[order[found]] = index_ids[pos[found]]
+
+        return ids
+
+    def _find(self, units):
+        """
+        Finds the IDs of the (distinct) units.
+
+        Parameters
+        ----------
+        units : list of str
+            The units (words/characters/bigrams).
+
+        Returns
+        -------
+        ids : numpy array of int64
+            The ID of every unit, -1 for the units that aren't known yet.
+        hashes : numpy array of int64
+            The hash of every unit.
+
+        """
+        hashes = np.fromiter(map(hash, units), dtype=np.int64, count=len(units))
+        ids = self._lookup(hashes)
+
+        # Check that the units found by their hash are the same units,
+        # comparing all of them with their bytes in the pool at once
+        found = np.flatnonzero(ids >= 0)
+        if not len(found):
+            return ids, hashes
+
+        starts = self.offsets[ids[found]]
+        lens = self.offsets[ids[found] + 1] - starts
+        pos = (np.repeat(starts - np.cumsum(lens) + lens, lens)
+               + np.arange(lens.sum()))
+        stored = np.frombuffer(self.pool, dtype=np.uint8)[pos].tobytes()
+
+        found_units = [units[idx] for idx in found.tolist()]
+        if stored != (UNIT_SEP.join(found_units) + UNIT_SEP).encode("utf-8"):
+            # Only look for the colliding units one by one
+            for idx, start, end in zip(found.tolist(), starts.tolist(),
+                                       (starts + lens).tolist()):
+                unit = units[idx]
+                if self.pool[start:end-1].decode("utf-8") != unit:
+                    ids[idx] = self._collisions.get(unit, -1)
+
+        return ids, hashes
+
+    def _index(self, units):
+        """
+        Looks up the (distinct) units, adding the new ones to the pool.
+
+        Parameters
+        ----------
+        units : list of str
+            The units (words/characters/bigrams).
+
+        Raises
+        ------
+        Exception
+            If a new unit contains UNIT_SEP.
+
+        Returns
+        -------
+        ids : numpy array of int64
+            The ID of every unit.
+
+        """
+        ids, hashes = self._find(units)
+
+        # Add the new units in the order in which they appear
+        new = np.flatnonzero(ids < 0)
+        if len(new):
+            new_units = [units[idx] for idx in new]
+            if any(UNIT_SEP in unit for unit in new_units):
+                raise Exception(f"The units can't contain {UNIT_SEP!r}.")
+
+            new_ids = np.arange(self.n_units, self.n_units + len(new))
+            ids[new] = new_ids
+
+            # Grow the count and offset buffers if they are full
+            n_units = self.n_units + len(new)
+            if n_units > len(self.counts):
+                size = max(n_units, len(self.counts) * 5 // 4)
+                counts = np.zeros(size, dtype=np.int64)
+                counts[:len(self.counts)] = self.counts
+                self.counts = counts
+                offsets = np.zeros(size + 1, dtype=np.int64)
+                offsets[:len(self.offsets)] = self.offsets
+                self.offsets = offsets
+
+            encoded = [(unit + UNIT_SEP).encode("utf-8") for unit in new_units]
+            unit_lens = np.fromiter(map(len, encoded), dtype=np.int64,
+                                    count=len(encoded))
+            self.offsets[self.n_units+1:n_units+1] = len(self.pool) + np.cumsum(unit_lens)
+            self.pool += b"".join(encoded)
+            self.n_units = n_units
+
+            # Only one unit per hash goes into the hash index,
+            # the others are kept in the dictionary of collisions
+            new_hashes = hashes[new]
+            _, first = np.unique(new_hashes, return_index=True)
+            indexed = np.zeros(len(new), dtype=bool)
+            indexed[first] = True
+            indexed &= self._lookup(new_hashes) < 0
+
+            self._add_hashes(new_hashes[indexed], new_ids[indexed])
+            for idx in np.flatnonzero(~indexed):
+                self._collisions[new_units[idx]] = int(new_ids[idx])
+
+            if self.on_new_unit is not None:
+                for unit in new_units:
+                    self.on_new_unit(unit)
+
+        return ids
+
+    def _add_hashes(self, hashes, ids):
+        """
+        Adds the hashes of new units to the index.
+
+        Parameters
+        ----------
+        hashes : numpy array of int64
+            The hashes of the new units.
+        ids : numpy array of int64
+            The IDs of the new units.
+
+        Returns
+        -------
+        None.
+
+        """
+        order = np.argsort(hashes)
+        pos = np.searchsorted(self._recent_hashes, hashes[order])
+        self._recent_hashes = np.insert(self._recent_hashes, pos, hashes[order])
+        self._recent_ids = np.insert(self._recent_ids, pos,
+                                     ids[order].astype(np.int32))
+
+        # Merge the new hashes into the main index once there are enough
+        if len(self._recent_hashes) >= RECENT_SIZE:
+            pos = np.searchsorted(self._hashes, self._recent_hashes)
+            self._hashes = np.insert(self._hashes, pos, self._recent_hashes)
+            self._hash_ids = np.insert(self._hash_ids, pos, self._recent_ids)
+            self._recent_hashes = np.zeros(0, dtype=np.int64)
+            self._recent_ids = np.zeros(0, dtype=np.int32)
+
+    def get_ids(self, units):
+        """
+        Returns the IDs of the units, adding the new units to the pool.
+        The units are not counted.
+
+        Parameters
+        ----------
+        units : list of str
+            The units (words/characters/bigrams).
+
+        Returns
+        -------
+        ids : numpy array of int64
+            The ID of every unit in the vocabulary.
+
+        """
+        self.flush()
+
+        # Look up every distinct unit only once
+        distinct = list(dict.fromkeys(units))
+        unit_ids = dict(zip(distinct, self._index(distinct).tolist()))
+
+        return np.fromiter(map(unit_ids.__getitem__, units), dtype=np.int64,
+                           count=len(units))
+
+    def get_id(self, unit):
+        """
+        Returns the ID of the unit, adding the unit to the pool if necessary.
+
+        Parameters
+        ----------
+        unit : str
+            The unit (word/character/bigram).
+
+        Returns
+        -------
+        unit_id : int
+            The ID of the unit in the vocabulary.
+
+        """
+        return int(self.get_ids([unit])[0])
+
+    def add(self, unit, count=1):
+        """
+        Counts an occurrence of the unit.
+
+        Parameters
+        ----------
+        unit : str
+            The unit (word/character/bigram) to count.
+        count : int, optional
+            The number of occurrences to add. The default is 1.
+
+        Returns
+        -------
+        None.
+
+        """
+        if count == 1:
+            self._pending.append(unit)
+            if len(self._pending) >= self.flush_size:
+                self.flush()
+        else:
+            # The count buffer can grow while the unit is added
+            unit_id = self.get_id(unit)
+            self.counts[unit_id] += count
+
+    def update(self, units):
+        """
+        Counts an occurrence of every unit in a sequence.
+
+        Parameters
+        ----------
+        units : iterable of str
+            The units (words/characters/bigrams) to count.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._pending.extend(units)
+
+        if len(self._pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Adds the buffered occurrences to the counts.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self._pending:
+            return
+
+        # Count the distinct units of the buffer first
+        pending = Counter(self._pending)
+        self._pending = []
+
+        ids = self._index(list(pending.keys()))
+        self.counts[ids] += np.fromiter(pending.values(), dtype=np.int64,
+                                        count=len(pending))
+
+    def get_units(self):
+        """
+        Returns all units in the order of their IDs.
+
+        Returns
+        -------
+        units : list of str
+            The units (words/characters/bigrams).
+
+        """
+        self.flush()
+        return self.pool.decode("utf-8").split(UNIT_SEP)[:-1]
+
+    def get_counts(self):
+        """
+        Returns the counts of all units in the order of their IDs.
+
+        Returns
+        -------
+        counts : numpy array of int64
+            The frequency of every unit, indexed by its ID.
+
+        """
+        self.flush()
+        return self.counts[:self.n_units]
+
+    def to_arrays(self):
+        """
+        Returns the units and their frequencies as two parallel arrays.
+
+        Returns
+        -------
+        units : numpy array of objects
+            The units in the order of their IDs.
+        counts : numpy array of int64
+            The frequency of every unit.
+
+        """
+        units = np.empty(len(self), dtype=object)
+        units[:] = self.get_units()
+        return units, self.get_counts()
+
+    def total(self):
+        """
+        Returns the total number of counted occurrences.
+
+        Returns
+        -------
+        total : int
+            The sum of all frequencies.
+
+        """
+        return int(self.get_counts().sum())
+
+    def items(self):
+        """
+        Iterates over the units and their frequencies like dict.items().
+
+        Returns
+        -------
+        iterator of (str, int)
+            The unit and its frequency.
+
+        """
+        return zip(self.get_units(), self.get_counts().tolist())
+
+    @classmethod
+    def from_dict(cls, freq_dict):
+        """
+        Creates a vocabulary from a dictionary of frequencies.
+
+        Parameters
+        ----------
+        freq_dict : dict
+            A dictionary containing unit to its frequency.
+
+        Returns
+        -------
+        vocab : Vocabulary
+            The vocabulary with the same frequencies.
+
+        """
+        counts = np.fromiter(freq_dict.values(), dtype=np.int64,
+                             count=len(freq_dict))
+        return cls.from_arrays(list(freq_dict.keys()), counts)
+
+    def merge(self, other):
+        """
+        Adds the frequencies of another vocabulary to this one.
+
+        Parameters
+        ----------
+        other : Vocabulary or dict
+            The vocabulary or dictionary containing unit to its frequency.
+
+        Returns
+        -------
+        None.
+
+        """
+        if isinstance(other, Vocabulary):
+            units, counts = other.get_units(), other.get_counts()
+        else:
+            units = list(other.keys())
+            counts = np.fromiter(other.values(), dtype=np.int64,
+                                 count=len(other))
+
+        ids = self.get_ids(units)
+        np.add.at(self.counts, ids, counts)
+
+    @classmethod
+    def from_arrays(cls, units, counts):
+        """
+        Creates a vocabulary from two parallel arrays of units and frequencies.
+
+        Parameters
+        ----------
+        units : sequence of str
+            The distinct units.
+        counts : numpy array of int64
+            The frequency of every unit.
+
+        Returns
+        -------
+        vocab : Vocabulary
+            The vocabulary with the same frequencies.
+
+        """
+        vocab = cls()
+        ids = vocab.get_ids(list(units))
+        vocab.counts[ids] = counts
+        return vocab